@@ -1,7 +1,8 @@
 from flask import Flask, flash, redirect, url_for
 from flask_login import LoginManager, current_user, logout_user
 from config import Config
-from services.auth_service import get_user_by_id
+from db.connection import init_app as init_db_session
+from services.auth_service import get_cached_user
 
 from routes.auth_routes import auth_bp
 from routes.dashboard_routes import dashboard_bp
@@ -11,6 +12,7 @@ from routes.warehouse_routes import warehouse_bp
 from routes.statistics_routes import statistics_bp
 from routes.reports_routes import reports_bp
 from routes.request_routes import request_bp
+from routes.export_routes import export_bp
 
 def create_app():
     app = Flask(__name__)
@@ -19,10 +21,11 @@ def create_app():
     login_manager = LoginManager()
     login_manager.login_view = "auth.login"
     login_manager.init_app(app)
+    init_db_session(app)
 
     @login_manager.user_loader
     def load_user(user_id):
-        return get_user_by_id(int(user_id))
+        return get_cached_user(int(user_id))
 
     @app.before_request
     def check_user_active():
@@ -39,6 +42,7 @@ def create_app():
     app.register_blueprint(statistics_bp)
     app.register_blueprint(reports_bp)
     app.register_blueprint(request_bp)
+    app.register_blueprint(export_bp)
 
     return app
 
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Script to move events older than the retention window from warehouse_events
+to warehouse_events_archive, summarising them per item and month.
+Meant to run from cron, e.g. nightly.
+
+    python archive_events.py [--months 6] [--batch-size 5000]
+"""
+import argparse
+from services.retention import archive_events
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old warehouse events")
+    parser.add_argument("--months", type=int, default=None,
+                        help="whole months to keep besides the current one (default: EVENT_RETENTION_MONTHS)")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    cutoff, moved = archive_events(months=args.months, batch_size=args.batch_size)
+    print(f"✅ Archived {moved} events older than {cutoff}")
+
+if __name__ == "__main__":
+    main()
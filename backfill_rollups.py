@@ -0,0 +1,23 @@
+"""
+Script to (re)build the tables derived from warehouse_events (and its archive).
+Run after importing events outside the app, or after upgrading an existing DB.
+"""
+from db.connection import db_cursor
+from services.rollups import rebuild_item_activity, rebuild_warehouse_totals, rebuild_daily_counters, rebuild_item_daily_stats, rebuild_item_monthly_stats
+
+def backfill_rollups():
+    with db_cursor() as (conn, cur):
+        rebuild_item_activity(cur)
+        print(f"✅ item_activity rebuilt ({cur.rowcount} rows touched)")
+        rebuild_warehouse_totals(cur)
+        print(f"✅ warehouse_stock_totals rebuilt ({cur.rowcount} rows)")
+        rebuild_daily_counters(cur)
+        print(f"✅ warehouse_daily_counters rebuilt ({cur.rowcount} rows)")
+        rebuild_item_daily_stats(cur)
+        print("✅ item_daily_stats / user_daily_activity rebuilt")
+        rebuild_item_monthly_stats(cur)
+        print(f"✅ item_monthly_stats rebuilt ({cur.rowcount} rows)")
+        conn.commit()
+
+if __name__ == "__main__":
+    backfill_rollups()
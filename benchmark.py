@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark the hot services and routes against the configured database.
+
+    python benchmark.py [--repeat 50] [--writers 8] [--out results.json]
+    python benchmark.py --seed --items 100000 --days 180 --events-per-day 5000
+    python benchmark.py --baseline baseline.json [--threshold 0.2]
+
+Every case is timed `repeat` times after a short warm-up and reported as
+JSON with p50/p95/p99 (ms). With --baseline, each case's p95 is compared to
+the stored run and the exit status is 1 if any case is slower by more than
+--threshold (a fraction, 0.2 = 20%).
+
+apply_stock_action is exercised by --writers concurrent threads doing ADD 1 /
+REMOVE 1 pairs, so stock levels end where they started (events do grow).
+"""
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from config import Config
+from db.connection import db_cursor, pool_stats
+from services import inventory_service, statistics_service
+
+STAT_FUNCTIONS = (
+    "get_quantity_changes", "get_top_added_items", "get_top_removed_items",
+    "get_activity_by_day", "get_activity_by_type", "get_statistics_summary", "get_low_stock_items",
+)
+ROUTES = ("/dashboard", "/inventory", "/reports")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples, wall=None):
+    ms = sorted(s * 1000 for s in samples)
+    result = {
+        "n": len(ms),
+        "p50": round(percentile(ms, 50), 3),
+        "p95": round(percentile(ms, 95), 3),
+        "p99": round(percentile(ms, 99), 3),
+        "mean": round(statistics.fmean(ms), 3),
+        "min": round(ms[0], 3),
+        "max": round(ms[-1], 3),
+    }
+    if wall:
+        result["throughput_per_s"] = round(len(ms) / wall, 1)
+    return result
+
+
+def time_calls(fn, repeat, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+# ---------- Fixtures ----------
+def load_fixture():
+    with db_cursor() as (_, cur):
+        cur.execute("SELECT id FROM users WHERE role='ADMIN' AND is_active ORDER BY id LIMIT 1")
+        admin = cur.fetchone()
+        cur.execute("SELECT qr_code FROM items WHERE qr_code IS NOT NULL ORDER BY RAND() LIMIT 500")
+        qr_codes = [row["qr_code"] for row in cur.fetchall()]
+        cur.execute("""
+            SELECT id FROM items
+            WHERE warehouse_id=%s AND quantity > 0
+            ORDER BY RAND() LIMIT 200
+        """, (Config.DEFAULT_WAREHOUSE_ID,))
+        item_ids = [row["id"] for row in cur.fetchall()]
+        cur.execute("SELECT COUNT(*) AS n FROM items")
+        items = cur.fetchone()["n"]
+        cur.execute("SELECT COUNT(*) AS n FROM warehouse_events")
+        events = cur.fetchone()["n"]
+    if not admin or not qr_codes or not item_ids:
+        sys.exit("❌ Need an admin user and items with stock and QR codes (run init_db / populate_events --generate)")
+    return {"admin_id": admin["id"], "qr_codes": qr_codes, "item_ids": item_ids,
+            "items": items, "events": events}
+
+
+# ---------- Cases ----------
+def bench_services(fixture, repeat):
+    rng = random.Random(1)
+    results = {
+        "list_inventory": time_calls(inventory_service.list_inventory, repeat),
+        "list_inventory_page": time_calls(inventory_service.list_inventory_page, repeat),
+        "get_item_details_by_qr": time_calls(
+            lambda: inventory_service.get_item_details_by_qr(rng.choice(fixture["qr_codes"])), repeat),
+        "get_item_with_events_by_qr": time_calls(
+            lambda: inventory_service.get_item_with_events_by_qr(rng.choice(fixture["qr_codes"])), repeat),
+    }
+    for name in STAT_FUNCTIONS:
+        fn = getattr(statistics_service, name)
+        # __wrapped__ bypasses the result cache: the cold cost of the query
+        results[f"statistics.{name}"] = time_calls(fn.__wrapped__, repeat)
+        results[f"statistics.{name}[cached]"] = time_calls(fn, repeat)
+    return results
+
+
+def bench_writers(fixture, writers, repeat):
+    samples, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(writers)
+
+    def writer(seed):
+        rng = random.Random(seed)
+        mine = []
+        start.wait()
+        for _ in range(repeat):
+            item_id = rng.choice(fixture["item_ids"])
+            for action in ("ADD", "REMOVE"):
+                began = time.perf_counter()
+                try:
+                    inventory_service.apply_stock_action(item_id, fixture["admin_id"], action, 1, "benchmark")
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                mine.append(time.perf_counter() - began)
+        with lock:
+            samples.extend(mine)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    wall_started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall_started
+
+    result = summarize(samples, wall) if samples else {"n": 0}
+    result["writers"] = writers
+    result["errors"] = len(errors)
+    return {f"apply_stock_action[{writers} writers]": result}
+
+
+def bench_routes(fixture, repeat):
+    from app import create_app
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(fixture["admin_id"])
+        session["_fresh"] = True
+
+    results = {}
+    for path in ROUTES:
+        def get(path=path):
+            response = client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} -> {response.status_code}")
+        results[f"GET {path}"] = time_calls(get, repeat)
+    return results
+
+
+# ---------- Baseline comparison ----------
+def compare(current, baseline, threshold):
+    """Print p95 deltas; returns the names of regressed cases"""
+    regressed = []
+    print(f"{'case':55} {'base p95':>10} {'now p95':>10} {'change':>8}", file=sys.stderr)
+    for name, now in current["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base or not base.get("p95") or "p95" not in now:
+            print(f"{name:55} {'—':>10} {now.get('p95', '—'):>10} {'new':>8}", file=sys.stderr)
+            continue
+        change = now["p95"] / base["p95"] - 1
+        flag = ""
+        if change > threshold:
+            regressed.append(name)
+            flag = " ❌"
+        print(f"{name:55} {base['p95']:>10} {now['p95']:>10} {change:>+8.1%}{flag}", file=sys.stderr)
+    return regressed
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark services and routes")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--skip", action="append", default=[], choices=("services", "writers", "routes"))
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    seed = parser.add_argument_group("seeding (populate_events.generate_dataset)")
+    seed.add_argument("--seed", action="store_true", help="insert a synthetic dataset first")
+    seed.add_argument("--items", type=int, default=100000)
+    seed.add_argument("--users", type=int, default=100)
+    seed.add_argument("--days", type=int, default=180)
+    seed.add_argument("--events-per-day", type=int, default=5000)
+    args = parser.parse_args()
+
+    dataset = None
+    if args.seed:
+        from populate_events import generate_dataset
+        dataset = generate_dataset(items=args.items, users=args.users, days=args.days,
+                                   events_per_day=args.events_per_day, seed=42)
+
+    fixture = load_fixture()
+    cases = {}
+    if "services" not in args.skip:
+        cases.update(bench_services(fixture, args.repeat))
+    if "writers" not in args.skip:
+        cases.update(bench_writers(fixture, args.writers, args.repeat))
+    if "routes" not in args.skip:
+        cases.update(bench_routes(fixture, args.repeat))
+
+    results = {
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "repeat": args.repeat,
+        "dataset": dataset or {"items": fixture["items"], "events": fixture["events"]},
+        "pool": pool_stats(),
+        "cases": cases,
+    }
+    output = json.dumps(results, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            print(f"\n❌ {len(regressed)} case(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+        print("\n✅ No regressions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,89 @@
 class Config:
     SECRET_KEY = "dev-secret-key"
+    MAX_CONTENT_LENGTH = 64 * 1024 * 1024    # bytes; larger request bodies get a 413
 
     DB_HOST = "127.0.0.1"
     DB_USER = "root"
     DB_PASSWORD = "vladi2004"
     DB_NAME = "Dronify"
 
+    # Database backend: "mysql", or "sqlite" for a single-node kiosk without
+    # a database server (db/sqlite_backend.py, WAL mode)
+    DB_BACKEND = "mysql"
+    SQLITE_PATH = "dronify.sqlite3"
+    SQLITE_BUSY_TIMEOUT = 5          # seconds a writer waits for the write lock
+
+    # Connection pool (db/pool.py)
+    DB_POOL_SIZE = 5             # connections kept open while idle
+    DB_POOL_MAX_OVERFLOW = 10    # extra connections allowed under load
+    DB_POOL_TIMEOUT = 30         # seconds to wait for a free connection
+    DB_POOL_RECYCLE = 3600       # seconds before a connection is replaced
+    DB_POOL_PRE_PING = True      # ping on checkout, reconnect if dead
+
+    # Cached user loader (services/auth_service.py)
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = 60              # seconds a cached user is trusted
+    USER_CACHE_VERSION_POLL = 2      # seconds between cross-worker version checks
+
+    # Concurrent report queries (services/report_executor.py)
+    REPORT_MAX_WORKERS = 8
+    REPORT_DEADLINE = 10             # seconds before missing sections fall back
+
+    # Statistics result cache, validated against the event watermark
+    STATS_CACHE_SIZE = 256           # cached results kept (LRU)
+
+    # Batch stock movements (POST /stock/batch)
+    STOCK_BATCH_MAX_LINES = 500
+
+    # Stock engine retries on lock-wait timeout / deadlock (services/stock_engine.py)
+    STOCK_RETRY_ATTEMPTS = 3
+    STOCK_RETRY_BACKOFF = 0.01       # seconds, doubled per attempt with jitter
+
+    # Group-commit writer for single stock movements (services/group_commit.py)
+    STOCK_GROUP_COMMIT = False       # off: every movement commits on its own
+    GROUP_COMMIT_MAX_ROWS = 200      # movements per transaction at most
+    GROUP_COMMIT_MAX_DELAY = 0.005   # seconds the writer waits to fill a batch
+    GROUP_COMMIT_TIMEOUT = 10        # seconds a caller waits for its outcome
+
+    # Bulk item import (import_items.py, POST /inventory/import)
+    IMPORT_CHUNK_SIZE = 500          # rows per multi-row INSERT / transaction
+
+    # Streaming exports (routes/export_routes.py)
+    EXPORT_BATCH_SIZE = 1000         # rows per fetchmany() / response chunk
+
+    # QR -> item id cache for scans (services/inventory_service.py)
+    QR_CACHE_SIZE = 4096
+    QR_CACHE_TTL = 300               # seconds; entries are also re-checked against the row on use
+
+    # Event log retention (services/retention.py, archive_events.py)
+    EVENT_RETENTION_MONTHS = 6       # whole months kept in warehouse_events besides the current one
+    ARCHIVE_BATCH_SIZE = 5000        # events moved to the archive per transaction
+
+    # Keyset pagination for /warehouse and /inventory (services/pagination.py)
+    PAGE_SIZE = 50                   # rows per page unless ?per_page= asks otherwise
+    MAX_PAGE_SIZE = 200              # upper bound for ?per_page=
+
+    # Camera capture (qr/qr_scanner.py)
+    CAMERA_SOURCE = 0                # cv2.VideoCapture device index or URL
+    CAMERA_TARGET_FPS = 15           # frames processed / streamed per second
+    CAMERA_BUFFER_FRAMES = 4         # raw frames kept in the capture ring buffer
+    STREAM_CLIENT_QUEUE = 2          # frames queued per /video_feed viewer before dropping the oldest
+    CAMERA_IDLE_SHUTDOWN = 5         # seconds without viewers before the device is released
+    QR_DETECT_EVERY_N = 3            # full-frame QR search on every Nth frame when no code is tracked
+    QR_DETECT_SCALE = 0.5            # downscale factor for the full-frame search
+    QR_DEBOUNCE_SECONDS = 2.0        # same code read again within this window is not a new scan
+    SSE_KEEPALIVE = 15               # seconds between keepalive comments on /scan/events
+
+    # Batch image decoding (qr/batch_decode.py, POST /scan/images)
+    QR_DECODE_WORKERS = None         # worker processes; None = one per CPU
+    QR_BATCH_MAX_IMAGES = 5000       # images per request / zip, after expansion
+    QR_MAX_IMAGE_BYTES = 25 * 1024 * 1024    # per image, uncompressed
+    QR_BATCH_MAX_BYTES = 128 * 1024 * 1024   # all images of a batch, uncompressed (held in memory)
+
+    # Query instrumentation for db_cursor() (db/instrumentation.py)
+    QUERY_INSTRUMENTATION = True     # time every statement, Server-Timing header per request
+    SLOW_QUERY_MS = 250              # log statements slower than this; None = off
+    SLOW_QUERY_LOG = None            # file for the slow-query log; None = standard logging only
+    N_PLUS_ONE_THRESHOLD = 20        # warn when a request runs one statement fingerprint more often
+
     DEFAULT_WAREHOUSE_ID = 1
@@ -1,8 +1,18 @@
 from contextlib import contextmanager
+import threading
 import mysql.connector
+from flask import g, has_app_context
 from config import Config
+from db import instrumentation, sqlite_backend
+from db.pool import ConnectionPool
+from db.session import DBSession
 
-def get_db():
+_pool = None
+_pool_lock = threading.Lock()
+
+def _connect():
+    if Config.DB_BACKEND == "sqlite":
+        return sqlite_backend.connect()
     return mysql.connector.connect(
         host=Config.DB_HOST,
         user=Config.DB_USER,
@@ -11,10 +21,70 @@ def get_db():
         autocommit=False
     )
 
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _connect,
+                    size=Config.DB_POOL_SIZE,
+                    max_overflow=Config.DB_POOL_MAX_OVERFLOW,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    recycle=Config.DB_POOL_RECYCLE,
+                    pre_ping=Config.DB_POOL_PRE_PING,
+                )
+    return _pool
+
+def pool_stats():
+    return get_pool().stats()
+
+def get_db():
+    """Check a connection out of the pool; close() returns it."""
+    return get_pool().acquire()
+
+def get_request_session():
+    """Connection shared by the current request (checked out lazily)."""
+    session = g.get("_db_session")
+    if session is None:
+        session = g._db_session = DBSession(get_db())
+    return session
+
+def in_outer_transaction():
+    """True when a db_cursor() block is already open in this request."""
+    if not has_app_context():
+        return False
+    session = g.get("_db_session")
+    return session is not None and session.depth > 0
+
+def close_request_session(exc=None):
+    session = g.pop("_db_session", None)
+    if session is not None:
+        session.close()
+
+def init_app(app):
+    app.teardown_appcontext(close_request_session)
+    instrumentation.init_app(app)
+
 @contextmanager
-def db_cursor(dict_cursor=True):
+def db_cursor(dict_cursor=True, savepoint=False):
+    """
+    Inside a Flask app context all blocks share the request's connection;
+    savepoint=True isolates a nested block's writes (see DBSession).
+    Outside one (scripts, worker threads) a dedicated connection is used.
+    Cursors are timed per statement (db/instrumentation.py).
+    """
+    if has_app_context():
+        with get_request_session().transaction(savepoint=savepoint) as conn:
+            cur = instrumentation.instrument(conn.cursor(dictionary=dict_cursor))
+            try:
+                yield conn, cur
+            finally:
+                cur.close()
+        return
+
     conn = get_db()
-    cur = conn.cursor(dictionary=dict_cursor)
+    cur = instrumentation.instrument(conn.cursor(dictionary=dict_cursor))
     try:
         yield conn, cur
         conn.commit()
@@ -24,3 +94,61 @@ def db_cursor(dict_cursor=True):
     finally:
         cur.close()
         conn.close()
+
+def stream_query(sql, params=(), batch_size=None):
+    """
+    Yield result rows (dicts) from an unbuffered cursor, fetchmany() at a time,
+    so memory stays flat regardless of result size. Runs on its own pooled
+    connection inside a read-only consistent snapshot, never on the request
+    session, so it can be consumed by a streamed response after teardown.
+    """
+    return stream_queries([(sql, params)], batch_size=batch_size)
+
+def stream_queries(queries, batch_size=None):
+    """stream_query() over several (sql, params) pairs, one after the other, in one snapshot"""
+    return StreamedRows(queries, batch_size or Config.EXPORT_BATCH_SIZE)
+
+class StreamedRows:
+    """
+    Lazy row iterator returned by stream_queries(); `columns` holds the
+    cursor's column names once the first statement has run, so consumers
+    can still write a header when the result is empty.
+    """
+
+    def __init__(self, queries, batch_size):
+        self.columns = None
+        # a streamed response is consumed after the request's context is gone,
+        # so the request's QueryStats are picked up here, not when rows are read
+        self._stats = instrumentation.current_stats()
+        self._rows = self._stream(queries, batch_size)
+
+    def __iter__(self):
+        return self._rows
+
+    def close(self):
+        self._rows.close()
+
+    def _stream(self, queries, batch_size):
+        conn = get_db()
+        cur = None
+        try:
+            conn.start_transaction(consistent_snapshot=True, readonly=True)
+            for sql, params in queries:
+                cur = instrumentation.instrument(conn.cursor(dictionary=True, buffered=False), self._stats)
+                cur.execute(sql, params)
+                self.columns = list(cur.column_names)
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+                cur.close()
+                cur = None
+        finally:
+            if cur is not None:
+                try:
+                    cur.close()
+                except Exception:
+                    # consumer stopped early; the pool discards the connection
+                    pass
+            conn.close()
@@ -2,16 +2,26 @@
 import mysql.connector
 from mysql.connector import Error
 from config import Config
+from db import sqlite_backend
 from werkzeug.security import generate_password_hash
+from services.rollups import rebuild_warehouse_totals
 
 
 DDL = [
     # Drop tables if exist (for development)
     "SET FOREIGN_KEY_CHECKS = 0;",
+    "DROP TABLE IF EXISTS item_activity;",
+    "DROP TABLE IF EXISTS warehouse_daily_counters;",
+    "DROP TABLE IF EXISTS warehouse_stock_totals;",
+    "DROP TABLE IF EXISTS item_daily_stats;",
+    "DROP TABLE IF EXISTS user_daily_activity;",
+    "DROP TABLE IF EXISTS item_monthly_stats;",
+    "DROP TABLE IF EXISTS warehouse_events_archive;",
     "DROP TABLE IF EXISTS warehouse_events;",
     "DROP TABLE IF EXISTS items;",
     "DROP TABLE IF EXISTS warehouses;",
     "DROP TABLE IF EXISTS users;",
+    "DROP TABLE IF EXISTS cache_versions;",
     "SET FOREIGN_KEY_CHECKS = 1;",
 
     # Users
@@ -55,7 +65,11 @@ DDL = [
         updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
         INDEX idx_items_type (type),
         INDEX idx_items_quantity (quantity),
-        INDEX idx_items_warehouse (warehouse_id)
+        INDEX idx_items_warehouse (warehouse_id),
+        INDEX idx_items_warehouse_name (warehouse_id, name),
+        INDEX idx_items_warehouse_type (warehouse_id, type),
+        INDEX idx_items_warehouse_quantity (warehouse_id, quantity),
+        UNIQUE INDEX uq_items_qr_code (qr_code)   -- NULLs allowed, scans resolve through it
     ) ENGINE=InnoDB;
     """,
 
@@ -85,7 +99,118 @@ DDL = [
 
         INDEX idx_we_warehouse_ts (warehouse_id, timestamp_created),
         INDEX idx_we_item_ts (item_id, timestamp_created),
-        INDEX idx_we_user_ts (user_id, timestamp_created)
+        INDEX idx_we_user_ts (user_id, timestamp_created),
+        INDEX idx_we_ts (timestamp_created)
+    ) ENGINE=InnoDB;
+    """,
+
+    # Events older than the retention window, moved here by archive_events.py
+    # (services/retention.py). Same columns; no foreign keys, rows are never
+    # updated and are purged together with their user / item.
+    """
+    CREATE TABLE IF NOT EXISTS warehouse_events_archive (
+        id INT PRIMARY KEY,
+        warehouse_id INT NOT NULL,
+        item_id INT NOT NULL,
+        user_id INT NOT NULL,
+        action ENUM('ADD','REMOVE','RETURN') NOT NULL,
+        quantity INT NOT NULL,
+        note VARCHAR(255) NULL,
+        timestamp_created TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_wea_warehouse_ts (warehouse_id, timestamp_created),
+        INDEX idx_wea_item_ts (item_id, timestamp_created),
+        INDEX idx_wea_user (user_id)
+    ) ENGINE=InnoDB;
+    """,
+
+    # Latest movement per item, maintained by the stock-write path (services/rollups.py)
+    """
+    CREATE TABLE IF NOT EXISTS item_activity (
+        item_id INT PRIMARY KEY,
+        last_in_ts TIMESTAMP NULL,
+        last_out_ts TIMESTAMP NULL,
+        last_event_id INT NULL,
+        last_event_action ENUM('ADD','REMOVE','RETURN') NULL,
+        last_event_qty INT NULL,
+        last_event_user_id INT NULL,
+        last_event_ts TIMESTAMP NULL,
+
+        CONSTRAINT fk_ia_item FOREIGN KEY (item_id)
+            REFERENCES items(id)
+            ON DELETE CASCADE ON UPDATE CASCADE
+    ) ENGINE=InnoDB;
+    """,
+
+    # Per warehouse/day/action movement counters, maintained by the stock-write path
+    """
+    CREATE TABLE IF NOT EXISTS warehouse_daily_counters (
+        warehouse_id INT NOT NULL,
+        day DATE NOT NULL,
+        action ENUM('ADD','REMOVE','RETURN') NOT NULL,
+        slot TINYINT NOT NULL DEFAULT 0,
+        event_count INT NOT NULL DEFAULT 0,
+        quantity BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (warehouse_id, day, action, slot)
+    ) ENGINE=InnoDB;
+    """,
+
+    # Running stock totals per warehouse (summed over slots)
+    """
+    CREATE TABLE IF NOT EXISTS warehouse_stock_totals (
+        warehouse_id INT NOT NULL,
+        slot TINYINT NOT NULL DEFAULT 0,
+        total_items INT NOT NULL DEFAULT 0,
+        total_quantity BIGINT NOT NULL DEFAULT 0,
+        low_stock_items INT NOT NULL DEFAULT 0,
+        write_version BIGINT NOT NULL DEFAULT 1,   -- bumped on every write, cache watermark
+        PRIMARY KEY (warehouse_id, slot)
+    ) ENGINE=InnoDB;
+    """,
+
+    # Per item/day/action movement rollup behind services/statistics_service.py
+    """
+    CREATE TABLE IF NOT EXISTS item_daily_stats (
+        item_id INT NOT NULL,
+        day DATE NOT NULL,
+        action ENUM('ADD','REMOVE','RETURN') NOT NULL,
+        warehouse_id INT NOT NULL,
+        event_count INT NOT NULL DEFAULT 0,
+        quantity BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (item_id, day, action),
+        INDEX idx_ids_warehouse_day (warehouse_id, day),
+
+        CONSTRAINT fk_ids_item FOREIGN KEY (item_id)
+            REFERENCES items(id)
+            ON DELETE CASCADE ON UPDATE CASCADE
+    ) ENGINE=InnoDB;
+    """,
+
+    # Per item/month/action summary of the archived events
+    """
+    CREATE TABLE IF NOT EXISTS item_monthly_stats (
+        item_id INT NOT NULL,
+        month DATE NOT NULL,                    -- first day of the month
+        action ENUM('ADD','REMOVE','RETURN') NOT NULL,
+        warehouse_id INT NOT NULL,
+        event_count INT NOT NULL DEFAULT 0,
+        quantity BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (item_id, month, action),
+        INDEX idx_ims_warehouse_month (warehouse_id, month),
+
+        CONSTRAINT fk_ims_item FOREIGN KEY (item_id)
+            REFERENCES items(id)
+            ON DELETE CASCADE ON UPDATE CASCADE
+    ) ENGINE=InnoDB;
+    """,
+
+    # Events per warehouse/day/user, for the distinct active-user count
+    """
+    CREATE TABLE IF NOT EXISTS user_daily_activity (
+        warehouse_id INT NOT NULL,
+        day DATE NOT NULL,
+        user_id INT NOT NULL,
+        event_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (warehouse_id, day, user_id)
     ) ENGINE=InnoDB;
     """,
 
@@ -116,28 +241,39 @@ DDL = [
     ) ENGINE=InnoDB;
     """,
 
+    # Cross-process cache invalidation counters (one row per cache name)
+    """
+    CREATE TABLE IF NOT EXISTS cache_versions (
+        name VARCHAR(50) PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0
+    ) ENGINE=InnoDB;
+    """,
+
     # Views
     """
     CREATE OR REPLACE VIEW vw_inventory AS
     SELECT 
         i.*,
         CASE WHEN i.quantity < i.min_quantity THEN 1 ELSE 0 END as is_low_stock,
-        (SELECT MAX(timestamp_created) FROM warehouse_events WHERE item_id = i.id AND action = 'ADD') as last_in_ts,
-        (SELECT MAX(timestamp_created) FROM warehouse_events WHERE item_id = i.id AND action = 'REMOVE') as last_out_ts
-    FROM items i;
+        ia.last_in_ts,
+        ia.last_out_ts
+    FROM items i
+    LEFT JOIN item_activity ia ON ia.item_id = i.id;
     """,
 
     """
     CREATE OR REPLACE VIEW vw_item_details AS
     SELECT 
         i.*,
-        (SELECT MAX(timestamp_created) FROM warehouse_events WHERE item_id = i.id AND action = 'ADD') as last_in_ts,
-        (SELECT MAX(timestamp_created) FROM warehouse_events WHERE item_id = i.id AND action = 'REMOVE') as last_out_ts,
-        (SELECT action FROM warehouse_events WHERE item_id = i.id ORDER BY timestamp_created DESC LIMIT 1) as last_event_action,
-        (SELECT quantity FROM warehouse_events WHERE item_id = i.id ORDER BY timestamp_created DESC LIMIT 1) as last_event_qty,
-        (SELECT u.first_name FROM warehouse_events we JOIN users u ON we.user_id = u.id WHERE we.item_id = i.id ORDER BY we.timestamp_created DESC LIMIT 1) as last_event_by,
-        (SELECT timestamp_created FROM warehouse_events WHERE item_id = i.id ORDER BY timestamp_created DESC LIMIT 1) as last_event_ts
-    FROM items i;
+        ia.last_in_ts,
+        ia.last_out_ts,
+        ia.last_event_action,
+        ia.last_event_qty,
+        u.first_name as last_event_by,
+        ia.last_event_ts
+    FROM items i
+    LEFT JOIN item_activity ia ON ia.item_id = i.id
+    LEFT JOIN users u ON u.id = ia.last_event_user_id;
     """,
 
     """
@@ -147,46 +283,64 @@ DDL = [
     JOIN users u ON we.user_id = u.id;
     """,
 
+    # Full history: live and archived events
+    """
+    CREATE OR REPLACE VIEW vw_event_log AS
+    SELECT id, warehouse_id, item_id, user_id, action, quantity, note, timestamp_created
+    FROM warehouse_events
+    UNION ALL
+    SELECT id, warehouse_id, item_id, user_id, action, quantity, note, timestamp_created
+    FROM warehouse_events_archive;
+    """,
+
     """
     CREATE OR REPLACE VIEW vw_dashboard_warehouse AS
     SELECT 
-        warehouse_id,
-        COUNT(*) as total_items,
-        SUM(quantity) as total_quantity,
-        SUM(CASE WHEN quantity < min_quantity THEN 1 ELSE 0 END) as low_stock_items,
-        (SELECT COUNT(*) FROM warehouse_events WHERE warehouse_id = i.warehouse_id AND DATE(timestamp_created) = CURDATE()) as events_today,
-        (SELECT COALESCE(SUM(quantity), 0) FROM warehouse_events WHERE warehouse_id = i.warehouse_id AND action = 'ADD' AND DATE(timestamp_created) = CURDATE()) as inbound_qty_today,
-        (SELECT COALESCE(SUM(quantity), 0) FROM warehouse_events WHERE warehouse_id = i.warehouse_id AND action = 'REMOVE' AND DATE(timestamp_created) = CURDATE()) as outbound_qty_today
-    FROM items i
-    GROUP BY warehouse_id;
+        t.warehouse_id,
+        CAST(SUM(t.total_items) AS SIGNED) as total_items,
+        CAST(SUM(t.total_quantity) AS SIGNED) as total_quantity,
+        CAST(SUM(t.low_stock_items) AS SIGNED) as low_stock_items,
+        (SELECT COALESCE(SUM(event_count), 0) FROM warehouse_daily_counters WHERE warehouse_id = t.warehouse_id AND day = CURDATE()) as events_today,
+        (SELECT COALESCE(SUM(quantity), 0) FROM warehouse_daily_counters WHERE warehouse_id = t.warehouse_id AND day = CURDATE() AND action = 'ADD') as inbound_qty_today,
+        (SELECT COALESCE(SUM(quantity), 0) FROM warehouse_daily_counters WHERE warehouse_id = t.warehouse_id AND day = CURDATE() AND action = 'REMOVE') as outbound_qty_today
+    FROM warehouse_stock_totals t
+    GROUP BY t.warehouse_id;
     """,
 ]
 
 
+def _connect_db():
+    if Config.DB_BACKEND == "sqlite":
+        # the file is created on first connect; the DDL is translated per statement
+        return sqlite_backend.connect()
+    return mysql.connector.connect(
+        host=Config.DB_HOST,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        database=Config.DB_NAME,
+    )
+
+
 def main():
     try:
         # 1) Connect without DB to ensure DB exists
-        conn = mysql.connector.connect(
-            host=Config.DB_HOST,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-        )
-        cur = conn.cursor()
-        cur.execute(
-            f"CREATE DATABASE IF NOT EXISTS `{Config.DB_NAME}` "
-            "CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;"
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
+        if Config.DB_BACKEND != "sqlite":
+            conn = mysql.connector.connect(
+                host=Config.DB_HOST,
+                user=Config.DB_USER,
+                password=Config.DB_PASSWORD,
+            )
+            cur = conn.cursor()
+            cur.execute(
+                f"CREATE DATABASE IF NOT EXISTS `{Config.DB_NAME}` "
+                "CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;"
+            )
+            conn.commit()
+            cur.close()
+            conn.close()
 
         # 2) Connect to the DB and create tables
-        conn = mysql.connector.connect(
-            host=Config.DB_HOST,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-            database=Config.DB_NAME,
-        )
+        conn = _connect_db()
         cur = conn.cursor()
         for stmt in DDL:
             cur.execute(stmt)
@@ -194,15 +348,11 @@ def main():
         cur.close()
         conn.close()
 
-        print("✅ MySQL DB initialized (users, items, warehouse_events).")
+        backend = "SQLite" if Config.DB_BACKEND == "sqlite" else "MySQL"
+        print(f"✅ {backend} DB initialized (users, items, warehouse_events).")
 
         # 3) Insert default data
-        conn = mysql.connector.connect(
-            host=Config.DB_HOST,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-            database=Config.DB_NAME,
-        )
+        conn = _connect_db()
         cur = conn.cursor()
 
         # Insert default warehouse
@@ -245,6 +395,7 @@ def main():
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                     ON DUPLICATE KEY UPDATE sku=sku
                 """, item)
+            rebuild_warehouse_totals(cur)
             conn.commit()
             print("✅ Dummy items inserted")
         except Error as e:
@@ -0,0 +1,218 @@
+"""
+Query instrumentation for db_cursor().
+
+Each statement run on a db_cursor() cursor is timed (execute plus its
+fetches) and recorded under its fingerprint, the SQL with literals and
+placeholder lists collapsed, with the rows it returned and the service
+function that issued it. Inside a request the numbers add up in a
+QueryStats on flask.g, which becomes the response's Server-Timing header
+and warns once per fingerprint when it repeats more than
+N_PLUS_ONE_THRESHOLD times (an N+1 loop). Statements slower than
+SLOW_QUERY_MS go to the "db.slow_queries" log, with or without a request.
+
+Worker threads have no app context; run them through bind() to count their
+queries towards the request that started them (services/report_executor.py).
+Streamed exports (stream_query()) count towards the request that created
+them too, though their Server-Timing header has gone out before the rows.
+"""
+import functools
+import logging
+import re
+import sys
+import threading
+import time
+from flask import g, has_app_context, has_request_context, request
+from config import Config
+
+log = logging.getLogger(__name__)
+slow_log = logging.getLogger("db.slow_queries")
+
+_bound = threading.local()
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROW_LIST = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """SQL with literals as ?, IN lists / VALUES rows collapsed to (?+), whitespace squeezed"""
+    fp = _NUMBER.sub("?", _STRING.sub("?", sql).replace("%s", "?"))
+    fp = _VALUE_LIST.sub("(?+)", " ".join(fp.split()))
+    return _ROW_LIST.sub("(?+)", fp)
+
+
+def _caller():
+    """module.function of the nearest frame outside the db package"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith("db.") and module != "contextlib":
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+class QueryStats:
+    """Statement count and DB time of one request, per fingerprint"""
+
+    def __init__(self, label=None):
+        self.label = label
+        self.count = 0
+        self.duration = 0.0
+        self.by_fingerprint = {}  # fingerprint -> {"count", "duration", "rows", "callers"}
+        self._warned = set()
+        self._lock = threading.Lock()
+
+    def record(self, fp, duration, rows, caller):
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            entry = self.by_fingerprint.setdefault(fp, {"count": 0, "duration": 0.0, "rows": 0, "callers": set()})
+            entry["count"] += 1
+            entry["duration"] += duration
+            entry["rows"] += rows
+            entry["callers"].add(caller)
+            repeated = entry["count"] > Config.N_PLUS_ONE_THRESHOLD and fp not in self._warned
+            if repeated:
+                self._warned.add(fp)
+        if repeated:
+            log.warning("Possible N+1 in %s: statement ran %d times (from %s): %s",
+                        self.label, entry["count"], ", ".join(sorted(entry["callers"])), fp)
+
+    def server_timing(self):
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+
+
+def current_stats():
+    """The QueryStats of this request, or the one bind() attached to this thread"""
+    if has_app_context():
+        stats = g.get("_query_stats")
+        if stats is None:
+            label = f"{request.method} {request.path}" if has_request_context() else None
+            stats = g._query_stats = QueryStats(label)
+        return stats
+    return getattr(_bound, "stats", None)
+
+
+def bind(fn, stats=None):
+    """Wrap fn so the queries it runs on another thread are recorded to stats (default: current_stats())"""
+    stats = stats or current_stats()
+    if stats is None:
+        return fn
+
+    @functools.wraps(fn)
+    def bound(*args, **kwargs):
+        previous = getattr(_bound, "stats", None)
+        _bound.stats = stats
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _bound.stats = previous
+    return bound
+
+
+def instrument(cursor, stats=None):
+    """Wrap cursor to record its statements to stats (default: current_stats())"""
+    if not Config.QUERY_INSTRUMENTATION:
+        return cursor
+    return InstrumentedCursor(cursor, stats or current_stats())
+
+
+class _Query:
+    __slots__ = ("sql", "caller", "duration", "rows", "fetched")
+
+    def __init__(self, sql, caller, duration):
+        self.sql = sql
+        self.caller = caller
+        self.duration = duration
+        self.rows = 0
+        self.fetched = False
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that times execute()/executemany() and the fetches that
+    follow; a statement is recorded once the next one starts or the cursor closes.
+    """
+
+    def __init__(self, cursor, stats=None):
+        self._cursor = cursor
+        self._stats = stats
+        self._query = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, sql, *args, **kwargs):
+        return self._timed(self._cursor.execute, sql, args, kwargs)
+
+    def executemany(self, sql, *args, **kwargs):
+        return self._timed(self._cursor.executemany, sql, args, kwargs)
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._fetch(self._cursor.fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+    def _timed(self, method, sql, args, kwargs):
+        self._finish()
+        caller = _caller()
+        started = time.perf_counter()
+        try:
+            return method(sql, *args, **kwargs)
+        finally:
+            self._query = _Query(sql, caller, time.perf_counter() - started)
+
+    def _fetch(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        result = method(*args, **kwargs)
+        query = self._query
+        if query is not None:
+            query.duration += time.perf_counter() - started
+            query.fetched = True
+            if isinstance(result, list):
+                query.rows += len(result)
+            elif result is not None:
+                query.rows += 1
+        return result
+
+    def _finish(self):
+        query, self._query = self._query, None
+        if query is None:
+            return
+        # rows returned for reads; for writes, the rows they affected
+        rows = query.rows if query.fetched else max(self._cursor.rowcount or 0, 0)
+        fp = fingerprint(query.sql)
+        if self._stats is not None:
+            self._stats.record(fp, query.duration, rows, query.caller)
+        ms = query.duration * 1000
+        if Config.SLOW_QUERY_MS is not None and ms >= Config.SLOW_QUERY_MS:
+            slow_log.warning("%.1f ms, %d rows, %s: %s", ms, rows, query.caller, fp)
+
+
+def init_app(app):
+    if Config.SLOW_QUERY_LOG and not slow_log.handlers:
+        handler = logging.FileHandler(Config.SLOW_QUERY_LOG)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        slow_log.addHandler(handler)
+        slow_log.setLevel(logging.WARNING)
+
+    @app.after_request
+    def add_server_timing(response):
+        stats = g.get("_query_stats")
+        if stats is not None:
+            response.headers.add("Server-Timing", stats.server_timing())
+        return response
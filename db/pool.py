@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(RuntimeError):
+    """No connection became free within the pool's wait timeout."""
+
+
+class PooledConnection:
+    """
+    Thin proxy around a raw DB connection.
+    close() hands the connection back to the pool instead of closing the socket.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        self._pool._release(raw, self._created_at)
+
+
+class ConnectionPool:
+    """
+    Fixed-size connection pool with overflow.
+
+      - size:         connections kept open while idle
+      - max_overflow: extra connections opened under load, closed on release
+      - timeout:      seconds acquire() waits for a free slot before PoolTimeout
+      - recycle:      seconds after which a connection is replaced on checkout
+      - pre_ping:     ping idle connections on checkout and replace dead ones
+    """
+
+    def __init__(self, connect, size=5, max_overflow=10, timeout=30.0, recycle=3600, pre_ping=True):
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._idle = deque()  # (raw, created_at)
+        self._open = 0        # connections currently open or being opened
+        self._cond = threading.Condition()
+        self._counters = {
+            "checkouts": 0,
+            "connects": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "wait_seconds": 0.0,
+        }
+
+    # ---------- Checkout / return ----------
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        raw, created_at = None, None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    # LIFO: hand out the most recently used (warmest) connection
+                    raw, created_at = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No DB connection available within {self.timeout}s "
+                        f"(size={self.size}, max_overflow={self.max_overflow})"
+                    )
+                self._cond.wait(remaining)
+            self._counters["checkouts"] += 1
+            self._counters["wait_seconds"] += time.monotonic() - started
+
+        if raw is not None and not self._is_usable(raw, created_at):
+            self._close_quietly(raw)
+            with self._cond:
+                self._counters["discarded"] += 1
+            raw = None
+
+        if raw is None:
+            # the slot is already reserved in _open, only the socket is missing
+            try:
+                raw = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            created_at = time.monotonic()
+            with self._cond:
+                self._counters["connects"] += 1
+
+        return PooledConnection(self, raw, created_at)
+
+    def _release(self, raw, created_at):
+        keep = True
+        try:
+            # never hand the next caller a connection in the middle of a transaction
+            if getattr(raw, "in_transaction", True):
+                raw.rollback()
+        except Exception:
+            keep = False
+
+        with self._cond:
+            if keep and len(self._idle) < self.size:
+                self._idle.append((raw, created_at))
+                raw = None
+            else:
+                self._open -= 1
+                if not keep:
+                    self._counters["discarded"] += 1
+            self._cond.notify()
+
+        if raw is not None:
+            self._close_quietly(raw)
+
+    def _is_usable(self, raw, created_at):
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            return False
+        if self.pre_ping:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    # ---------- Maintenance ----------
+    def dispose(self):
+        """Close every idle connection (e.g. after fork or on shutdown)."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for raw, _ in idle:
+            self._close_quietly(raw)
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": idle,
+                "in_use": self._open - idle,
+                **self._counters,
+            }
@@ -0,0 +1,72 @@
+from contextlib import contextmanager
+
+
+class DBSession:
+    """
+    One pooled connection shared by every db_cursor() block of a request.
+
+    The outermost block owns the transaction (commit on success, rollback on error).
+    Nested blocks join it; blocks opened with savepoint=True get their own
+    SAVEPOINT so a failure only undoes their part of the work.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.depth = 0
+        self._savepoint_seq = 0
+
+    def _execute(self, sql):
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql)
+        finally:
+            cur.close()
+
+    @contextmanager
+    def transaction(self, savepoint=False):
+        outermost = self.depth == 0
+        name = None
+        if not outermost and savepoint:
+            self._savepoint_seq += 1
+            name = f"sp_{self._savepoint_seq}"
+            self._execute(f"SAVEPOINT {name}")
+
+        self.depth += 1
+        try:
+            yield _SessionConnection(self)
+        except Exception:
+            if outermost:
+                self.conn.rollback()
+            elif name:
+                self._execute(f"ROLLBACK TO SAVEPOINT {name}")
+            raise
+        else:
+            if outermost:
+                self.conn.commit()
+            elif name:
+                self._execute(f"RELEASE SAVEPOINT {name}")
+        finally:
+            self.depth -= 1
+
+    def close(self):
+        conn, self.conn = self.conn, None
+        if conn is not None:
+            conn.close()
+
+
+class _SessionConnection:
+    """
+    Connection handed to db_cursor callers inside a request.
+    An explicit conn.commit() in a nested block would end the enclosing
+    transaction (and its savepoints), so it is left to the outermost block.
+    """
+
+    def __init__(self, session):
+        self._session = session
+
+    def __getattr__(self, name):
+        return getattr(self._session.conn, name)
+
+    def commit(self):
+        if self._session.depth <= 1:
+            self._session.conn.commit()
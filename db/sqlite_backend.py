@@ -0,0 +1,434 @@
+"""
+Embedded SQLite backend for single-node kiosk deployments (DB_BACKEND = "sqlite").
+
+connect() returns a connection that behaves like a mysql.connector one as far
+as the pool, DBSession and db_cursor() are concerned. The rest of the code
+keeps writing MySQL; every statement goes through translate() first, which
+rewrites what SQLite spells differently:
+
+  - %s placeholders; ENUM, AUTO_INCREMENT, inline INDEX definitions,
+    ON UPDATE CURRENT_TIMESTAMP (a trigger) and CREATE OR REPLACE VIEW
+  - ON DUPLICATE KEY UPDATE -> ON CONFLICT DO UPDATE
+  - UPDATE t JOIN (...) SET -> UPDATE t SET ... FROM (...)
+  - DELETE ... LIMIT, SELECT ... FOR UPDATE
+  - DATE_SUB/DATE_ADD with INTERVAL, DAYOFMONTH, IF, GREATEST/LEAST,
+    CONCAT, MOD, CAST(... AS SIGNED), NOW(), CURDATE(), RAND()
+
+The database runs in WAL mode, so readers keep their snapshot while a writer
+commits. There are no row locks: FOR UPDATE is dropped and a transaction that
+starts with a write or a locking read takes the database write lock up front
+(BEGIN IMMEDIATE). As in MySQL, DDL commits the open transaction first.
+
+sqlite3 errors are re-raised as mysql.connector errors with the closest MySQL
+errno, so `except Error` and RETRYABLE_ERRORS work unchanged.
+Needs SQLite 3.35+ (UPSERT without a conflict target).
+"""
+import calendar
+import functools
+import random
+import re
+import sqlite3
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from mysql.connector import errorcode, errors
+from config import Config
+
+Translation = namedtuple("Translation", "statements kind")  # kind: ddl, insert, write or read
+
+_WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+
+
+def _convert_timestamp(value):
+    text = value.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def _convert_date(value):
+    text = value.decode()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        return text
+
+
+sqlite3.register_converter("TIMESTAMP", _convert_timestamp)
+sqlite3.register_converter("DATE", _convert_date)
+
+
+# ---------- Connection ----------
+def connect(path=None):
+    raw = sqlite3.connect(
+        path or Config.SQLITE_PATH,
+        timeout=Config.SQLITE_BUSY_TIMEOUT,
+        isolation_level=None,  # transactions are begun explicitly, see _begin()
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        check_same_thread=False,  # pooled connections move between threads
+    )
+    raw.execute("PRAGMA journal_mode = WAL")
+    raw.execute("PRAGMA synchronous = NORMAL")
+    raw.execute("PRAGMA foreign_keys = ON")
+    raw.create_function("DATE_SUB_INTERVAL", 3, lambda value, amount, unit: _shift(value, amount, unit, -1))
+    raw.create_function("DATE_ADD_INTERVAL", 3, lambda value, amount, unit: _shift(value, amount, unit, 1))
+    raw.create_function("RAND", 0, random.random)
+    return SQLiteConnection(raw)
+
+
+class SQLiteConnection:
+    def __init__(self, raw):
+        self._raw = raw
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def cursor(self, dictionary=False, buffered=None):
+        # sqlite3 steps through results lazily either way, buffered is moot
+        return SQLiteCursor(self, dictionary)
+
+    def start_transaction(self, consistent_snapshot=False, isolation_level=None, readonly=None):
+        # a deferred transaction reads from one WAL snapshot until it ends
+        if self._raw.in_transaction:
+            raise errors.ProgrammingError("Transaction already in progress")
+        self._run("BEGIN")
+
+    def commit(self):
+        if self._raw.in_transaction:
+            self._run("COMMIT")
+
+    def rollback(self):
+        if self._raw.in_transaction:
+            self._run("ROLLBACK")
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        self._run("SELECT 1")
+
+    def close(self):
+        self._raw.close()
+
+    def _run(self, sql):
+        try:
+            self._raw.execute(sql)
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def _begin(self, kind):
+        if kind == "ddl":
+            if self._raw.in_transaction:
+                self._raw.execute("COMMIT")
+        elif not self._raw.in_transaction:
+            self._raw.execute("BEGIN" if kind == "read" else "BEGIN IMMEDIATE")
+
+
+class SQLiteCursor:
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection._raw.cursor()
+        self._dictionary = dictionary
+        self.rowcount = -1
+        self.lastrowid = None
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    def execute(self, sql, params=()):
+        translation = translate(sql)
+        try:
+            self._connection._begin(translation.kind)
+            if len(translation.statements) == 1:
+                self._cursor.execute(translation.statements[0], tuple(params or ()))
+            else:
+                for statement in translation.statements:
+                    self._cursor.execute(statement)
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = None
+        if translation.kind == "insert" and self._cursor.rowcount > 0:
+            # MySQL reports the first id of a multi-row INSERT, SQLite the last
+            self.lastrowid = self._cursor.lastrowid - self._cursor.rowcount + 1
+
+    def executemany(self, sql, seq_params):
+        translation = translate(sql)
+        try:
+            self._connection._begin(translation.kind)
+            for statement in translation.statements:
+                self._cursor.executemany(statement, [tuple(params) for params in seq_params])
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = None
+
+    def fetchone(self):
+        return self._row(self._fetch(self._cursor.fetchone))
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._fetch(self._cursor.fetchmany, size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._fetch(self._cursor.fetchall)]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._cursor.close()
+
+    def _fetch(self, method, *args):
+        try:
+            return method(*args)
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+
+# sqlite3.IntegrityError message prefix -> MySQL errno
+_INTEGRITY_ERRNOS = (
+    ("UNIQUE constraint failed", errorcode.ER_DUP_ENTRY),
+    ("FOREIGN KEY constraint failed", errorcode.ER_ROW_IS_REFERENCED_2),
+    ("NOT NULL constraint failed", errorcode.ER_BAD_NULL_ERROR),
+    ("CHECK constraint failed", errorcode.ER_CHECK_CONSTRAINT_VIOLATED),  # also the emulated ENUMs
+)
+
+
+def _mysql_error(e):
+    message = str(e)
+    if isinstance(e, sqlite3.IntegrityError):
+        for prefix, errno in _INTEGRITY_ERRNOS:
+            if message.startswith(prefix):
+                return errors.IntegrityError(msg=message, errno=errno)
+        return errors.IntegrityError(msg=message)
+    if isinstance(e, sqlite3.OperationalError) and ("locked" in message or "busy" in message):
+        # the transaction has to start over, like after an InnoDB deadlock
+        return errors.DatabaseError(msg=message, errno=errorcode.ER_LOCK_DEADLOCK)
+    if isinstance(e, sqlite3.OperationalError):
+        return errors.ProgrammingError(msg=message, errno=errorcode.ER_PARSE_ERROR)
+    return errors.DatabaseError(msg=message)
+
+
+def _shift(value, amount, unit, sign):
+    """DATE_SUB / DATE_ADD: a DATE stays a DATE, anything else becomes a DATETIME"""
+    if value is None or amount is None:
+        return None
+    text = str(value)
+    moment = datetime.fromisoformat(text)
+    amount = int(amount) * sign
+    unit = unit.upper()
+    if unit in ("MONTH", "YEAR"):
+        months = moment.year * 12 + moment.month - 1 + (amount * 12 if unit == "YEAR" else amount)
+        year, month = divmod(months, 12)
+        day = min(moment.day, calendar.monthrange(year, month + 1)[1])
+        moment = moment.replace(year=year, month=month + 1, day=day)
+    else:
+        moment += timedelta(**{unit.lower() + "s": amount})
+    if len(text) == 10 and unit in ("DAY", "WEEK", "MONTH", "YEAR"):
+        return moment.date().isoformat()
+    return moment.isoformat(" ")
+
+
+# ---------- Dialect ----------
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE(\s+NOWAIT|\s+SKIP\s+LOCKED)?\b", re.I)
+_ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_VALUES_FN = re.compile(r"\bVALUES\s*\(\s*(\w+)\s*\)", re.I)
+_DERIVED_ALIAS = re.compile(r"\)\s+AS\s+(\w+)(\s+ORDER\s+BY\s+[\w\s,.]+?)?\s*$", re.I)
+_UPDATE_JOIN = re.compile(r"UPDATE\s+(\w+)\s+(?:AS\s+)?(\w+)\s+JOIN\s*\(", re.I)
+_UPDATE_JOIN_REST = re.compile(r"\s*(?:AS\s+)?(\w+)\s+ON\s+(.*?)\s+SET\s+(.*)$", re.I | re.S)
+_DELETE_LIMIT = re.compile(r"DELETE\s+FROM\s+(\w+)\s+WHERE\s+(.*?)\s+LIMIT\s+(\?|\d+)$", re.I | re.S)
+_PLUS_INTERVAL = re.compile(r"(\?|[\w.]+)\s*\+\s*INTERVAL\s+(\?|\w+)\s+(\w+)", re.I)
+_INTERVAL_ARG = re.compile(r"INTERVAL\s+(.+)\s+(\w+)$", re.I | re.S)
+
+_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\(", re.I)
+_CREATE_VIEW = re.compile(r"CREATE\s+OR\s+REPLACE\s+VIEW\s+(\w+)", re.I)
+_INLINE_INDEX = re.compile(r"(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*(\(.*\))$", re.I | re.S)
+_ENUM = re.compile(r"(\w+)\s+ENUM\s*\(([^)]*)\)", re.I)
+_AUTO_INCREMENT = re.compile(r"\b(?:BIG)?INT(?:EGER)?\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.I)
+_ON_UPDATE_NOW = re.compile(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP\b", re.I)
+_DEFAULT_NOW = re.compile(r"\bDEFAULT\s+CURRENT_TIMESTAMP\b", re.I)
+_FOREIGN_KEY_CHECKS = re.compile(r"SET\s+FOREIGN_KEY_CHECKS\s*=\s*(\d)", re.I)
+
+
+@functools.lru_cache(maxsize=1024)
+def translate(sql):
+    """One MySQL statement -> Translation(SQLite statements, kind)"""
+    sql = sql.strip().rstrip(";").strip()
+    head = sql.split(None, 1)[0].upper() if sql else ""
+
+    if head == "SET":
+        checks = _FOREIGN_KEY_CHECKS.match(sql)
+        if checks:
+            return Translation((f"PRAGMA foreign_keys = {'ON' if checks.group(1) == '1' else 'OFF'}",), "ddl")
+        return Translation((), "ddl")  # session variables have no SQLite counterpart
+    if head in ("CREATE", "DROP", "ALTER"):
+        return Translation(_translate_ddl(sql), "ddl")
+
+    sql = sql.replace("%s", "?")
+    locking = _FOR_UPDATE.search(sql) is not None
+    sql = _translate_functions(_FOR_UPDATE.sub("", sql))
+    if head == "UPDATE" and _UPDATE_JOIN.match(sql):
+        sql = _translate_update_join(sql)
+    elif head == "DELETE":
+        sql = _DELETE_LIMIT.sub(r"DELETE FROM \1 WHERE rowid IN (SELECT rowid FROM \1 WHERE \2 LIMIT \3)", sql)
+    elif head == "INSERT":
+        sql = _translate_upsert(sql)
+
+    if head == "INSERT":
+        kind = "insert"
+    elif head in _WRITES or locking:
+        kind = "write"
+    else:
+        kind = "read"
+    return Translation((sql,), kind)
+
+
+def _translate_functions(sql):
+    sql = re.sub(r"\bIF\s*\(", "IIF(", sql, flags=re.I)
+    sql = re.sub(r"\bGREATEST\s*\(", "MAX(", sql, flags=re.I)
+    sql = re.sub(r"\bLEAST\s*\(", "MIN(", sql, flags=re.I)
+    sql = re.sub(r"\bAS\s+(?:UN)?SIGNED\b", "AS INTEGER", sql, flags=re.I)
+    sql = re.sub(r"\bCURDATE\s*\(\s*\)", "date('now', 'localtime')", sql, flags=re.I)
+    sql = re.sub(r"\bNOW\s*\(\s*\)", "datetime('now', 'localtime')", sql, flags=re.I)
+    sql = _PLUS_INTERVAL.sub(r"DATE_ADD_INTERVAL(\1, \2, '\3')", sql)
+    sql = _rewrite_calls(sql, "CONCAT", lambda args: "(" + " || ".join(f"({a})" for a in args) + ")")
+    sql = _rewrite_calls(sql, "MOD", lambda args: f"(({args[0]}) % ({args[1]}))")
+    sql = _rewrite_calls(sql, "DAYOFMONTH", lambda args: f"CAST(strftime('%d', {args[0]}) AS INTEGER)")
+    sql = _rewrite_calls(sql, "DATE_SUB", lambda args: _interval_call("DATE_SUB_INTERVAL", args))
+    sql = _rewrite_calls(sql, "DATE_ADD", lambda args: _interval_call("DATE_ADD_INTERVAL", args))
+    return sql
+
+
+def _interval_call(function, args):
+    interval = _INTERVAL_ARG.match(args[1])
+    if interval is None:
+        raise errors.ProgrammingError(f"Unsupported interval in SQLite dialect: {args[1]}")
+    return f"{function}({args[0]}, ({interval.group(1)}), '{interval.group(2).upper()}')"
+
+
+def _translate_upsert(sql):
+    match = _ON_DUPLICATE.search(sql)
+    if match is None:
+        return sql
+    head, assignments = sql[:match.start()].rstrip(), sql[match.end():].strip()
+    assignments = _VALUES_FN.sub(r"excluded.\1", assignments)
+    derived = _DERIVED_ALIAS.search(head)
+    if derived:
+        # INSERT ... SELECT * FROM (...) AS d: the incoming row is `excluded`, and
+        # the WHERE keeps SQLite from reading ON CONFLICT as a join constraint
+        alias = derived.group(1)
+        head = f"{head[:derived.start()]}) AS {alias} WHERE true{derived.group(2) or ''}"
+        assignments = re.sub(rf"\b{alias}\.", "excluded.", assignments)
+    return f"{head} ON CONFLICT DO UPDATE SET {assignments}"
+
+
+def _translate_update_join(sql):
+    match = _UPDATE_JOIN.match(sql)
+    table, alias = match.groups()
+    close = _closing_paren(sql, match.end() - 1)
+    rest = _UPDATE_JOIN_REST.match(sql, close + 1)
+    if rest is None:
+        raise errors.ProgrammingError("Unsupported UPDATE ... JOIN in SQLite dialect")
+    derived, condition, assignments = rest.groups()
+    # the assigned columns must not be qualified in SQLite
+    assignments = ", ".join(re.sub(rf"^{alias}\.", "", a) for a in _split_args(assignments))
+    return (f"UPDATE {table} AS {alias} SET {assignments} "
+            f"FROM ({sql[match.end():close]}) AS {derived} WHERE {condition}")
+
+
+def _translate_ddl(sql):
+    sql = re.sub(r"--[^\n]*", "", sql)
+    view = _CREATE_VIEW.match(sql)
+    if view:
+        name = view.group(1)
+        body = _translate_functions(sql[view.end():])
+        return (f"DROP VIEW IF EXISTS {name}", f"CREATE VIEW {name}{body}")
+
+    table = _CREATE_TABLE.match(sql)
+    if table is None:
+        return (sql,)
+    if_not_exists, name = table.group(1) or "", table.group(2)
+    close = _closing_paren(sql, table.end() - 1)
+    columns, indexes, triggers = [], [], []
+    for definition in _split_args(sql[table.end():close]):
+        index = _INLINE_INDEX.match(definition)
+        if index:
+            unique, index_name, index_columns = index.groups()
+            indexes.append(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS "
+                           f"{index_name} ON {name} {index_columns}")
+            continue
+        if _ON_UPDATE_NOW.search(definition):
+            column = definition.split()[0]
+            triggers.append(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{name}_{column} AFTER UPDATE ON {name} "
+                f"FOR EACH ROW WHEN NEW.{column} IS OLD.{column} BEGIN "
+                f"UPDATE {name} SET {column} = datetime('now', 'localtime') WHERE rowid = NEW.rowid; END"
+            )
+            definition = _ON_UPDATE_NOW.sub("", definition)
+        definition = _ENUM.sub(r"\1 TEXT CHECK (\1 IN (\2))", definition)
+        definition = _AUTO_INCREMENT.sub("INTEGER PRIMARY KEY AUTOINCREMENT", definition)
+        definition = _DEFAULT_NOW.sub("DEFAULT (datetime('now', 'localtime'))", definition)
+        columns.append(definition)
+    create = f"CREATE TABLE {if_not_exists}{name} (\n    " + ",\n    ".join(columns) + "\n)"
+    return (create, *indexes, *triggers)
+
+
+def _rewrite_calls(sql, name, rewrite):
+    """Replace each name(args) call with rewrite(args), innermost first"""
+    pattern = re.compile(rf"\b{name}\s*\(", re.I)
+    while True:
+        calls = list(pattern.finditer(sql))
+        if not calls:
+            return sql
+        call = calls[-1]
+        close = _closing_paren(sql, call.end() - 1)
+        sql = sql[:call.start()] + rewrite(_split_args(sql[call.end():close])) + sql[close + 1:]
+
+
+def _closing_paren(sql, start):
+    depth, quote = 0, None
+    for i in range(start, len(sql)):
+        ch = sql[i]
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise errors.ProgrammingError("Unbalanced parentheses in SQL")
+
+
+def _split_args(text):
+    """Split on top-level commas (outside parentheses and quotes)"""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(text[start:i].strip())
+            start = i + 1
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
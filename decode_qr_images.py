@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Script to decode QR labels from a batch of photos (e.g. a stocktake) and
+resolve them to items.
+
+    python decode_qr_images.py photos/ more.zip IMG_001.jpg [--workers 8] [--json] [--no-lookup]
+
+Directories are walked recursively; zip archives are expanded.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from qr.batch_decode import IMAGE_EXTENSIONS, iter_images, decode_images
+
+def _files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS | {".zip"}:
+                        full = os.path.join(root, name)
+                        with open(full, "rb") as f:
+                            yield full, f.read()
+        else:
+            with open(path, "rb") as f:
+                yield path, f.read()
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode QR codes from images and look up their items")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-images", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="print one JSON document instead of a summary")
+    parser.add_argument("--no-lookup", action="store_true", help="only decode, don't query the database")
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = decode_images(iter_images(_files(args.paths), max_images=args.max_images), executor=executor)
+
+    codes = [code for r in results for code in r.codes]
+    items = {}
+    if not args.no_lookup:
+        from services.inventory_service import resolve_qr_codes
+        items = resolve_qr_codes(codes)
+
+    if args.json:
+        print(json.dumps({
+            "images": [r.to_dict() for r in results],
+            "items": items,
+            "unresolved": sorted(set(codes) - items.keys()) if not args.no_lookup else None,
+        }, indent=2, default=str))
+        return
+
+    for r in results:
+        if r.error:
+            print(f"❌ {r.name}: {r.error}")
+        elif not r.codes:
+            print(f"⚠️ {r.name}: no QR code found")
+        else:
+            labels = [f"{c} -> {items[c]['sku']} {items[c]['name']}" if c in items else c for c in r.codes]
+            print(f"✅ {r.name}: " + ", ".join(labels))
+
+    print(f"\n📷 Images: {len(results)}   QR codes: {len(set(codes))}   "
+          f"Failed: {sum(1 for r in results if r.error)}   Without code: {sum(1 for r in results if not r.error and not r.codes)}")
+    if not args.no_lookup:
+        unresolved = sorted(set(codes) - items.keys())
+        print(f"📦 Matched items: {len(items)}   Unknown codes: {len(unresolved)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Script to bulk import items from a CSV, JSON or NDJSON file (upsert by SKU).
+
+    python import_items.py catalogue.csv [--warehouse 1] [--format csv]
+
+CSV columns / JSON keys: sku, name, type, description, quantity,
+min_quantity, location, qr_code. Only name and type are required.
+"""
+import argparse
+import os
+from services.import_service import read_rows, import_items
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import items (upsert by SKU)")
+    parser.add_argument("path")
+    parser.add_argument("--warehouse", type=int, default=None)
+    parser.add_argument("--format", choices=("csv", "json", "ndjson"), default=None)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.path)[1].lstrip(".").lower()
+    with open(args.path, "rb") as f:
+        report = import_items(read_rows(f, fmt), warehouse_id=args.warehouse, chunk_size=args.chunk_size)
+
+    print(f"✅ Inserted: {report.inserted}   Updated: {report.updated}")
+    if report.errors:
+        print(f"⚠️ {len(report.errors)} rows skipped:")
+        for row, msg in report.errors:
+            print(f"   row {row}: {msg}")
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,7 @@ class Warehouse:
       - add_item
       - remove_item
       - list_items
+      - page_items
     """
     id: int
     name: str
@@ -42,23 +43,39 @@ class Warehouse:
             return Warehouse(id=row["id"], name=row["name"], timestamp_created=row["timestamp_created"])
 
     # ---------- Item queries ----------
+    _ITEM_COLUMNS = """
+        SELECT id, sku, warehouse_id, name, description, type, timestamp_created,
+               updated_at, quantity, qr_code, min_quantity, location
+        FROM items
+    """
+
     def list_items(self) -> list[Item]:
         from db.connection import db_cursor
         with db_cursor() as (_, cur):
-            # uses base table (safe). If you prefer your view: SELECT * FROM vw_inventory WHERE warehouse_id=%s
-            cur.execute(
-                """
-                SELECT id, warehouse_id, name, description, type, timestamp_created,
-                       quantity, qr_code, min_quantity, location
-                FROM items
-                WHERE warehouse_id=%s
-                ORDER BY name
-                """,
-                (self.id,),
-            )
+            cur.execute(self._ITEM_COLUMNS + " WHERE warehouse_id=%s ORDER BY name", (self.id,))
             rows = cur.fetchall()
             return [Item.from_row(r) for r in rows]
 
+    def page_items(self, sort: str = "name", order: str = "asc", limit: int | None = None,
+                   after: str | None = None, before: str | None = None):
+        """
+        One page of items sorted by name / type / quantity, using keyset
+        pagination (see services/pagination.py). Raises ValueError on a bad cursor.
+        """
+        from db.connection import db_cursor
+        from services.inventory_service import SORT_COLUMNS
+        from services.pagination import fetch_page
+        if sort not in SORT_COLUMNS:
+            sort = "name"
+        with db_cursor() as (_, cur):
+            page = fetch_page(
+                cur, self._ITEM_COLUMNS, ["warehouse_id=%s"], [self.id],
+                sort, descending=(order == "desc"),
+                limit=limit, after=after, before=before,
+            )
+        page.items = [Item.from_row(r) for r in page.items]
+        return page
+
     def quantity_per_item(self, item: Union[int, str]) -> int:
         """
         item can be:
@@ -94,42 +111,5 @@ class Warehouse:
         """
         Updates items.quantity and inserts warehouse_events row in one DB transaction.
         """
-        if qty <= 0:
-            raise ValueError("qty must be > 0")
-        if action not in ("ADD", "REMOVE", "RETURN"):
-            raise ValueError("Invalid action")
-
-        delta = qty if action in ("ADD", "RETURN") else -qty
-
-        from db.connection import db_cursor
-        with db_cursor() as (_, cur):
-            # lock item row to avoid double updates from multiple users
-            cur.execute(
-                """
-                SELECT id, quantity
-                FROM items
-                WHERE id=%s AND warehouse_id=%s
-                FOR UPDATE
-                """,
-                (item_id, self.id),
-            )
-            row = cur.fetchone()
-            if not row:
-                raise ValueError("Item not found in this warehouse")
-
-            new_qty = int(row["quantity"]) + delta
-            if new_qty < 0:
-                raise ValueError("Not enough stock to remove")
-
-            cur.execute(
-                "UPDATE items SET quantity=%s WHERE id=%s",
-                (new_qty, item_id),
-            )
-
-            cur.execute(
-                """
-                INSERT INTO warehouse_events (warehouse_id, item_id, user_id, action, quantity, note)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """,
-                (self.id, item_id, user_id, action, qty, note),
-            )
+        from services.stock_engine import apply_movement
+        apply_movement(item_id, user_id, action, qty, note, warehouse_id=self.id)
@@ -1,9 +1,28 @@
 """
 Script to populate sample warehouse events for testing statistics
+
+    python populate_events.py              # ~150 events on the first 6 items
+
+Or generate a synthetic load-test dataset of any size:
+
+    python populate_events.py --generate --items 100000 --users 200 --warehouses 3 \
+        --days 365 --events-per-day 20000 [--seasonality 0.3] [--skew 1.1] [--seed 42]
+
+Generated items start at quantity 0 and end at exactly the net of their
+events (a REMOVE that would go negative becomes a restocking ADD), so
+items.quantity reconciles with the event log. Rows are written with batched
+multi-row INSERTs, one transaction per batch.
 """
 from db.connection import db_cursor
-from datetime import datetime, timedelta
+from services.inventory_service import ALLOWED_TYPES
+from services.rollups import (rebuild_item_activity, rebuild_warehouse_totals, rebuild_daily_counters,
+                              rebuild_item_daily_stats, bump_write_version)
+from datetime import date, datetime, timedelta
+import argparse
+import itertools
+import math
 import random
+import time
 
 def populate_sample_events():
     """Add sample warehouse events for the last 30 days"""
@@ -76,6 +95,11 @@ def populate_sample_events():
                 event['timestamp'],
                 event['note']
             ))
+        # events were inserted directly, refresh the derived tables
+        rebuild_item_activity(cur)
+        rebuild_daily_counters(cur)
+        rebuild_item_daily_stats(cur)
+        bump_write_version(cur, 1)
         conn.commit()
     
     print(f"✅ Added {len(events)} sample warehouse events")
@@ -83,5 +107,157 @@ def populate_sample_events():
     print(f"   Items involved: {len(items)}")
     
 
+def _insert_rows(conn, cur, sql, rows, batch_size):
+    """executemany() in batches (sent as multi-row INSERTs), committing each one"""
+    rows = iter(rows)
+    total = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return total
+        cur.executemany(sql, batch)
+        conn.commit()
+        total += len(batch)
+
+
+def _daily_volume(day, events_per_day, seasonality, rng):
+    """Events for one day: yearly wave, quiet weekends, some noise"""
+    season = 1 + seasonality * math.sin(2 * math.pi * day.timetuple().tm_yday / 365.25)
+    weekday = 0.3 if day.weekday() >= 5 else 1.0
+    return max(0, int(rng.gauss(events_per_day * season * weekday, events_per_day * 0.05)))
+
+
+def generate_dataset(items=10000, users=50, warehouses=1, days=90, events_per_day=2000,
+                     seasonality=0.3, skew=1.1, seed=None, batch_size=5000, tag=None):
+    """
+    Insert a synthetic dataset and rebuild the derived tables.
+    Item popularity follows a Zipf-like law with exponent `skew`.
+    Returns a summary dict (also used by the benchmark suite).
+    """
+    rng = random.Random(seed)
+    tag = tag or datetime.now().strftime("%Y%m%d%H%M%S")
+    started = time.monotonic()
+
+    with db_cursor(dict_cursor=False) as (conn, cur):
+        # warehouses 1..N
+        cur.executemany(
+            "INSERT INTO warehouses (id, name) VALUES (%s, %s) ON DUPLICATE KEY UPDATE id=id",
+            [(w, "Main Warehouse" if w == 1 else f"Warehouse {w}") for w in range(1, warehouses + 1)],
+        )
+        conn.commit()
+
+        from werkzeug.security import generate_password_hash
+        password_hash = generate_password_hash("loadtest")
+        _insert_rows(conn, cur, """
+            INSERT INTO users (first_name, last_name, email, password_hash, role)
+            VALUES (%s, %s, %s, %s, 'STAFF')
+            ON DUPLICATE KEY UPDATE id=id
+        """, ((f"Load{n}", f"Tester{tag}", f"load{n}.{tag}@example.com", password_hash)
+              for n in range(users)), batch_size)
+        cur.execute("SELECT id FROM users WHERE last_name = %s ORDER BY id", (f"Tester{tag}",))
+        user_ids = [row[0] for row in cur.fetchall()]
+
+        types = sorted(ALLOWED_TYPES)
+        _insert_rows(conn, cur, """
+            INSERT INTO items (sku, name, type, description, quantity, min_quantity, location, warehouse_id, qr_code)
+            VALUES (%s, %s, %s, NULL, 0, %s, %s, %s, %s)
+        """, ((f"SYN{tag}-{n:07d}", f"Synthetic part {n}", rng.choice(types), rng.randint(1, 20),
+               f"Shelf {chr(65 + n % 26)}{n % 50}", 1 + n % warehouses, f"QR-SYN{tag}-{n:07d}")
+              for n in range(items)), batch_size)
+        cur.execute("SELECT id, warehouse_id FROM items WHERE sku LIKE %s ORDER BY sku", (f"SYN{tag}-%",))
+        item_rows = cur.fetchall()
+        print(f"✅ {len(user_ids)} users, {len(item_rows)} items, {warehouses} warehouses")
+
+        # popularity rank -> item, weights 1 / rank^skew
+        ranked = list(range(len(item_rows)))
+        rng.shuffle(ranked)
+        cum_weights = list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(len(ranked))))
+        stock = [0] * len(item_rows)
+
+        def events():
+            first_day = date.today() - timedelta(days=days)
+            for offset in range(days):  # up to yesterday, nothing in the future
+                day = first_day + timedelta(days=offset)
+                n = _daily_volume(day, events_per_day, seasonality, rng)
+                picks = rng.choices(ranked, cum_weights=cum_weights, k=n)
+                seconds = sorted(rng.randint(7 * 3600, 19 * 3600) for _ in range(n))
+                base = datetime.combine(day, datetime.min.time())
+                for idx, second in zip(picks, seconds):
+                    roll = rng.random()
+                    if roll < 0.55:
+                        action, qty = "REMOVE", rng.randint(1, 10)
+                    elif roll < 0.65:
+                        action, qty = "RETURN", rng.randint(1, 5)
+                    else:
+                        action, qty = "ADD", rng.randint(5, 50)
+                    if action == "REMOVE" and stock[idx] < qty:
+                        action, qty = "ADD", rng.randint(5, 50)   # restock instead
+                    stock[idx] += -qty if action == "REMOVE" else qty
+                    item_id, warehouse_id = item_rows[idx]
+                    yield (warehouse_id, item_id, rng.choice(user_ids), action, qty,
+                           base + timedelta(seconds=second), f"Synthetic {action.lower()}")
+
+        event_count = _insert_rows(conn, cur, """
+            INSERT INTO warehouse_events (warehouse_id, item_id, user_id, action, quantity, timestamp_created, note)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, events(), batch_size)
+        print(f"✅ {event_count} events over {days} days")
+
+        # final quantities = net of each item's events
+        changed = [(item_rows[i][0], qty) for i, qty in enumerate(stock) if qty]
+        for start in range(0, len(changed), 1000):
+            chunk = changed[start:start + 1000]
+            cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+            cur.execute(f"""
+                UPDATE items SET quantity = CASE id {cases} END
+                WHERE id IN ({", ".join(["%s"] * len(chunk))})
+            """, [v for pair in chunk for v in pair] + [item_id for item_id, _ in chunk])
+            conn.commit()
+
+        # events were inserted directly, refresh the derived tables
+        rebuild_item_activity(cur)
+        rebuild_warehouse_totals(cur)
+        rebuild_daily_counters(cur)
+        rebuild_item_daily_stats(cur)
+        for w in range(1, warehouses + 1):
+            bump_write_version(cur, w)
+        conn.commit()
+
+    summary = {
+        "tag": tag,
+        "items": len(item_rows),
+        "users": len(user_ids),
+        "warehouses": warehouses,
+        "events": event_count,
+        "days": days,
+        "qr_prefix": f"QR-SYN{tag}-",
+        "seconds": round(time.monotonic() - started, 1),
+    }
+    print(f"✅ Done in {summary['seconds']}s")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Populate sample or synthetic load-test data")
+    parser.add_argument("--generate", action="store_true", help="generate a synthetic dataset instead of the small sample")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--warehouses", type=int, default=1)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--events-per-day", type=int, default=2000)
+    parser.add_argument("--seasonality", type=float, default=0.3, help="amplitude of the yearly wave (0 = flat)")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of item popularity (0 = uniform)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    if not args.generate:
+        populate_sample_events()
+        return
+    generate_dataset(items=args.items, users=args.users, warehouses=args.warehouses, days=args.days,
+                     events_per_day=args.events_per_day, seasonality=args.seasonality, skew=args.skew,
+                     seed=args.seed, batch_size=args.batch_size)
+
+
 if __name__ == "__main__":
-    populate_sample_events()
+    main()
@@ -0,0 +1,137 @@
+"""
+Decode QR codes from uploaded images / photo batches on a process pool.
+
+OpenCV decoding is CPU bound and holds the GIL for part of the work, so the
+images are spread over worker processes (one cv2.QRCodeDetector each).
+Nothing here touches the database; resolving codes to items is
+services.inventory_service.resolve_qr_codes.
+"""
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Optional
+from config import Config
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+_pool = None
+_pool_lock = threading.Lock()
+_detector = None  # per worker process
+
+
+@dataclass
+class ImageResult:
+    name: str
+    codes: list = field(default_factory=list)
+    error: Optional[str] = None
+
+    def to_dict(self):
+        return {"name": self.name, "codes": self.codes, "error": self.error}
+
+
+def _decode_one(job):
+    """Worker: (name, image bytes) -> ImageResult"""
+    global _detector
+    import cv2
+    import numpy as np
+    from qr.detector import decode_still
+
+    name, data = job
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return ImageResult(name, error="Not a readable image")
+    if _detector is None:
+        _detector = cv2.QRCodeDetector()
+    try:
+        return ImageResult(name, codes=decode_still(image, _detector))
+    except cv2.error as e:
+        return ImageResult(name, error=str(e))
+
+
+def iter_images(files, max_images=None):
+    """
+    Yield (name, bytes) for every image in files, an iterable of (filename,
+    bytes) pairs; zip archives are expanded. Raises ValueError past max_images,
+    or when an image or the batch as a whole is over the byte limits.
+    """
+    max_images = max_images or Config.QR_BATCH_MAX_IMAGES
+    count = 0
+    for name, data in _expand(files):
+        count += 1
+        if count > max_images:
+            raise ValueError(f"At most {max_images} images per batch")
+        yield name, data
+
+
+def _expand(files):
+    total = 0
+    for filename, data in files:
+        if not filename.lower().endswith(".zip"):
+            total = _check_size(filename, len(data), total)
+            yield filename, data
+            continue
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and os.path.splitext(info.filename)[1].lower() in IMAGE_EXTENSIONS:
+                    name = f"{filename}/{info.filename}"
+                    # checked against the size in the zip directory before inflating;
+                    # zipfile never reads past it (a lying entry fails its CRC check)
+                    total = _check_size(name, info.file_size, total)
+                    yield name, archive.read(info)
+
+
+def _check_size(name, size, total):
+    """Running uncompressed total after adding one image, or ValueError"""
+    if size > Config.QR_MAX_IMAGE_BYTES:
+        raise ValueError(f"{name} is larger than {Config.QR_MAX_IMAGE_BYTES} bytes")
+    total += size
+    if total > Config.QR_BATCH_MAX_BYTES:
+        raise ValueError(f"Images larger than {Config.QR_BATCH_MAX_BYTES} bytes in total")
+    return total
+
+
+def get_pool():
+    """Shared worker pool for the web endpoint, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: forking a threaded server process is unsafe
+            _pool = ProcessPoolExecutor(max_workers=Config.QR_DECODE_WORKERS or os.cpu_count(),
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _discard_pool(pool):
+    """Drop a broken shared pool so the next get_pool() starts a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def decode_images(images, executor=None):
+    """
+    Decode (name, bytes) pairs in parallel; returns ImageResults in input order.
+    executor defaults to the shared pool. BrokenProcessPool (a worker died,
+    e.g. killed for memory) is re-raised after the shared pool is replaced,
+    so only this batch fails.
+    """
+    images = list(images)
+    if not images:
+        return []
+    shared = executor is None
+    executor = executor or get_pool()
+    workers = getattr(executor, "_max_workers", None) or os.cpu_count() or 1
+    chunksize = max(1, min(32, len(images) // (workers * 4)))
+    try:
+        return list(executor.map(_decode_one, images, chunksize=chunksize))
+    except BrokenProcessPool:
+        if shared:
+            _discard_pool(executor)
+        raise
@@ -0,0 +1,157 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+import cv2
+import numpy as np
+from config import Config
+
+
+@dataclass
+class Detection:
+    data: Optional[str] = None          # decoded text, None if nothing was read
+    bbox: Optional[np.ndarray] = None   # 4x2 int corner points in frame coordinates
+    is_new: bool = False                # first read of this code outside the debounce window
+
+
+class QRDetectionPipeline:
+    """
+    Cheaper QR detection for a live stream.
+
+      - a full search runs on a downscaled grayscale copy, every Nth frame only
+      - after a hit, the code's bounding box (plus a margin) is re-decoded on
+        every frame at full resolution, which is a much smaller image; the
+        ROI is dropped after roi_misses consecutive misses
+      - repeated reads of the same code within debounce seconds are reported
+        with is_new=False, so callers act on each scan once
+
+    Not thread-safe on its own: one pipeline per camera worker thread.
+    """
+
+    def __init__(self, every_n=None, scale=None, debounce=None, roi_margin=0.3, roi_misses=5):
+        self.every_n = every_n or Config.QR_DETECT_EVERY_N
+        self.scale = scale or Config.QR_DETECT_SCALE
+        self.debounce = Config.QR_DEBOUNCE_SECONDS if debounce is None else debounce
+        self.roi_margin = roi_margin
+        self.roi_misses = roi_misses
+        self.detector = cv2.QRCodeDetector()
+
+        self._frame_no = 0
+        self._roi = None            # last bbox in frame coordinates
+        self._roi_missed = 0
+        self._last_data = None
+        self._last_emit = 0.0
+
+        self._stats_lock = threading.Lock()
+        self.counters = {
+            "frames": 0, "full_runs": 0, "roi_runs": 0,
+            "hits": 0, "emitted": 0, "decode_seconds": 0.0, "max_decode_seconds": 0.0,
+        }
+
+    # ---------- Detection ----------
+    def process(self, frame) -> Detection:
+        self._frame_no += 1
+        self._count(frames=1)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+        data, bbox = None, None
+        if self._roi is not None:
+            data, bbox = self._decode_roi(gray)
+            if bbox is None:
+                self._roi_missed += 1
+                if self._roi_missed >= self.roi_misses:
+                    self._roi = None
+
+        if bbox is None and self._roi is None and self._frame_no % self.every_n == 0:
+            data, bbox = self._decode_full(gray)
+
+        if bbox is None:
+            return Detection()
+
+        self._roi, self._roi_missed = bbox, 0
+        if not data:
+            return Detection(bbox=bbox)
+
+        self._count(hits=1)
+        now = time.monotonic()
+        is_new = data != self._last_data or now - self._last_emit >= self.debounce
+        if is_new:
+            self._count(emitted=1)
+            self._last_emit = now
+        self._last_data = data
+        return Detection(data=data, bbox=bbox, is_new=is_new)
+
+    def _decode_full(self, gray):
+        small = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        data, points = self._decode(small, "full_runs")
+        if points is None:
+            return None, None
+        return data, (points / self.scale).astype(int)
+
+    def _decode_roi(self, gray):
+        h, w = gray.shape[:2]
+        (x0, y0), (x1, y1) = self._roi.min(axis=0), self._roi.max(axis=0)
+        mx, my = int((x1 - x0) * self.roi_margin), int((y1 - y0) * self.roi_margin)
+        x0, y0 = max(0, x0 - mx), max(0, y0 - my)
+        x1, y1 = min(w, x1 + mx), min(h, y1 + my)
+        if x1 - x0 < 8 or y1 - y0 < 8:
+            return None, None
+        data, points = self._decode(gray[y0:y1, x0:x1], "roi_runs")
+        if points is None:
+            return None, None
+        return data, points.astype(int) + (x0, y0)
+
+    def _decode(self, image, counter):
+        started = time.perf_counter()
+        data, points, _ = self.detector.detectAndDecode(image)
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.counters[counter] += 1
+            self.counters["decode_seconds"] += elapsed
+            self.counters["max_decode_seconds"] = max(self.counters["max_decode_seconds"], elapsed)
+        if points is None:
+            return None, None
+        return data.strip(), points.reshape(-1, 2)
+
+    # ---------- Counters ----------
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                self.counters[name] += delta
+
+    def stats(self):
+        with self._stats_lock:
+            c = dict(self.counters)
+        runs = c["full_runs"] + c["roi_runs"]
+        return {
+            "frames": c["frames"],
+            "full_runs": c["full_runs"],
+            "roi_runs": c["roi_runs"],
+            "hits": c["hits"],
+            "emitted": c["emitted"],
+            "hit_rate": round(c["hits"] / runs, 3) if runs else 0.0,
+            "avg_decode_ms": round(c["decode_seconds"] / runs * 1000, 2) if runs else 0.0,
+            "max_decode_ms": round(c["max_decode_seconds"] * 1000, 2),
+        }
+
+
+def decode_still(image, detector=None, max_side=1600):
+    """
+    Every QR code readable in a still image (BGR or grayscale), as a list of
+    strings. Large photos are searched downscaled to max_side first, and at
+    full resolution only if that finds nothing.
+    """
+    detector = detector or cv2.QRCodeDetector()
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+    attempts = [gray]
+    scale = max_side / max(gray.shape[:2])
+    if scale < 1:
+        attempts.insert(0, cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA))
+
+    for candidate in attempts:
+        ok, decoded, _, _ = detector.detectAndDecodeMulti(candidate)
+        codes = [d.strip() for d in decoded if d and d.strip()] if ok else []
+        if codes:
+            return list(dict.fromkeys(codes))
+    return []
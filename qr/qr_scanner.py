@@ -1,57 +1,276 @@
 import cv2
 import numpy as np
 from flask import Response
+import threading
 import time
+from collections import deque
+from config import Config
+from qr.detector import QRDetectionPipeline
+from services.pubsub import PubSub
+
+# Every new (debounced) QR read from any camera: {"qr_code": ..., "detected_at": ...}
+qr_detections = PubSub()
 
 class VideoCamera:
-    def __init__(self):
-        self.video = cv2.VideoCapture(0)
+    """
+    Camera with background capture.
+
+    A capture thread reads frames at the device rate into a small ring buffer.
+    A worker thread picks the newest buffered frame at most target_fps times a
+    second, runs QR detection (qr/detector.py), draws the overlay and
+    JPEG-encodes it. Readers
+    only wait for the latest encoded frame, so no request thread ever touches
+    the device or OpenCV.
+    """
+    def __init__(self, source=None, target_fps=None, buffer_frames=None, detections=None):
+        self.video = cv2.VideoCapture(Config.CAMERA_SOURCE if source is None else source)
         self.video.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         self.video.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.detector = cv2.QRCodeDetector()
+        self.pipeline = QRDetectionPipeline()
         self.last_qr_code = None
         self.qr_detected_time = None
-        
+        self.target_fps = target_fps or Config.CAMERA_TARGET_FPS
+        self.detections = qr_detections if detections is None else detections
+
+        self._raw = deque(maxlen=buffer_frames or Config.CAMERA_BUFFER_FRAMES)
+        self._captured = 0      # frames read from the device so far
+        self._jpeg = None       # latest encoded frame
+        self._seq = 0           # bumped for every encoded frame
+        self._lock = threading.Lock()
+        self._raw_ready = threading.Condition(self._lock)
+        self._frame_ready = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="camera-capture", daemon=True),
+            threading.Thread(target=self._process_loop, name="camera-process", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
     def __del__(self):
+        self.stop()
+
+    @property
+    def running(self):
+        return not self._stopped.is_set()
+
+    def stop(self):
+        """Stop the background threads and release the device"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        with self._lock:
+            self._raw_ready.notify_all()
+            self._frame_ready.notify_all()
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join(timeout=2)
         self.video.release()
-    
-    def get_frame(self):
-        """Get frame from camera with QR detection overlay"""
-        success, frame = self.video.read()
-        if not success:
-            return None
-            
-        # Detect QR code
-        data, bbox, _ = self.detector.detectAndDecode(frame)
-        
+
+    # ---------- Background threads ----------
+    def _capture_loop(self):
+        while not self._stopped.is_set():
+            success, frame = self.video.read()  # blocks for the next device frame
+            if not success:
+                self._stopped.wait(0.05)
+                continue
+            with self._lock:
+                self._raw.append(frame)
+                self._captured += 1
+                self._raw_ready.notify()
+
+    def _process_loop(self):
+        interval = 1.0 / self.target_fps
+        seen = 0
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            with self._lock:
+                self._raw_ready.wait_for(lambda: self._captured != seen or self._stopped.is_set(), timeout=1.0)
+                if self._captured == seen:
+                    continue
+                frame = self._raw[-1]
+                seen = self._captured
+
+            jpeg = self._render(frame)
+            if jpeg is not None:
+                with self._lock:
+                    self._jpeg = jpeg
+                    self._seq += 1
+                    self._frame_ready.notify_all()
+            self._stopped.wait(max(0.0, interval - (time.monotonic() - started)))
+
+    def _render(self, frame):
+        """QR detection overlay + JPEG encode for one raw frame"""
+        detection = self.pipeline.process(frame)
+
         # Draw bounding box if QR code detected
-        if bbox is not None:
-            bbox = bbox.astype(int)
-            for i in range(len(bbox[0])):
-                pt1 = tuple(bbox[0][i])
-                pt2 = tuple(bbox[0][(i + 1) % len(bbox[0])])
+        if detection.bbox is not None:
+            points = detection.bbox
+            for i in range(len(points)):
+                pt1 = tuple(int(v) for v in points[i])
+                pt2 = tuple(int(v) for v in points[(i + 1) % len(points)])
                 cv2.line(frame, pt1, pt2, (0, 255, 0), 3)
-            
-            if data:
-                self.last_qr_code = data.strip()
-                self.qr_detected_time = time.time()
-                cv2.putText(frame, f"QR: {data}", (10, 30), 
+
+            if detection.data:
+                if detection.is_new:
+                    with self._lock:
+                        self.last_qr_code = detection.data
+                        self.qr_detected_time = time.time()
+                    self.detections.publish({"qr_code": detection.data, "detected_at": self.qr_detected_time})
+                cv2.putText(frame, f"QR: {detection.data}", (10, 30),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         else:
-            cv2.putText(frame, "Position QR code in view", (10, 30), 
+            cv2.putText(frame, "Position QR code in view", (10, 30),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        
+
         ret, jpeg = cv2.imencode('.jpg', frame)
-        return jpeg.tobytes()
-    
+        return jpeg.tobytes() if ret else None
+
+    # ---------- Readers ----------
+    def wait_frame(self, after_seq=0, timeout=None):
+        """
+        Block until a frame newer than after_seq is encoded.
+        Returns (seq, jpeg_bytes), or (after_seq, None) on timeout / stop.
+        """
+        with self._lock:
+            self._frame_ready.wait_for(lambda: self._seq != after_seq or self._stopped.is_set(), timeout=timeout)
+            if self._seq == after_seq or self._jpeg is None:
+                return after_seq, None
+            return self._seq, self._jpeg
+
+    def get_frame(self, timeout=1.0):
+        """Latest encoded frame with QR detection overlay (None if none yet)"""
+        return self.wait_frame(0, timeout=timeout)[1]
+
     def get_last_qr_code(self):
         """Get the last detected QR code"""
         return self.last_qr_code
 
-def generate_frames(camera):
-    """Generate frames for video streaming"""
-    while True:
-        frame = camera.get_frame()
+    def pop_last_qr_code(self):
+        """Return the last detected QR code and clear it, atomically"""
+        with self._lock:
+            qr_code, self.last_qr_code = self.last_qr_code, None
+            return qr_code
+
+    def detection_stats(self):
+        """Detection counters (runs, hit rate, decode latency)"""
+        return self.pipeline.stats()
+
+def generate_frames(camera, fps=None):
+    """Generate frames for video streaming, paced to fps (default: the camera's target)"""
+    interval = 1.0 / (fps or camera.target_fps)
+    seq = 0
+    while camera.running:
+        started = time.monotonic()
+        seq, frame = camera.wait_frame(seq, timeout=1.0)
         if frame is not None:
             yield (b'--frame\r\n'
                    b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+class _Subscriber:
+    """Per-viewer frame queue; when full, the oldest frame is dropped"""
+    def __init__(self, maxlen):
+        self.frames = deque(maxlen=maxlen)
+        self.dropped = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def put(self, frame):
+        with self._cond:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self.frames or self.closed, timeout=timeout)
+            return self.frames.popleft() if self.frames else None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+class FrameBroadcaster:
+    """
+    One camera, many viewers.
+
+    A pump thread takes every encoded frame from the camera once and hands
+    the same bytes to each subscribed stream. A slow viewer only loses its own
+    oldest frames. The camera is opened by the first subscriber and released
+    once nobody has been watching for idle_shutdown seconds.
+    """
+    def __init__(self, camera_factory=VideoCamera, queue_frames=None, idle_shutdown=None):
+        self.camera_factory = camera_factory
+        self.queue_frames = queue_frames or Config.STREAM_CLIENT_QUEUE
+        self.idle_shutdown = Config.CAMERA_IDLE_SHUTDOWN if idle_shutdown is None else idle_shutdown
+        self._camera = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def camera(self):
+        """The running camera, or None while nobody is watching"""
+        return self._camera
+
+    def viewers(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self):
+        sub = _Subscriber(self.queue_frames)
+        with self._lock:
+            self._subscribers.add(sub)
+            if self._camera is None:
+                self._camera = self.camera_factory()
+                threading.Thread(target=self._pump, args=(self._camera,), name="camera-broadcast", daemon=True).start()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+        sub.close()
+
+    def _pump(self, camera):
+        seq = 0
+        idle_since = None
+        while camera.running:
+            seq, frame = camera.wait_frame(seq, timeout=0.5)
+            with self._lock:
+                subscribers = list(self._subscribers)
+                if not subscribers:
+                    idle_since = idle_since or time.monotonic()
+                    if time.monotonic() - idle_since >= self.idle_shutdown:
+                        # still under the lock, so a new subscriber can't
+                        # open the device before this one has let go of it
+                        self._camera = None
+                        camera.stop()
+                        return
+                    continue
+            idle_since = None
+            if frame is not None:
+                for sub in subscribers:
+                    sub.put(frame)
+
+        # camera stopped on its own (device gone): end every stream
+        with self._lock:
+            if self._camera is camera:
+                self._camera = None
+            subscribers, self._subscribers = self._subscribers, set()
+        for sub in subscribers:
+            sub.close()
+
+    def stream(self):
+        """multipart/x-mixed-replace body for one viewer"""
+        sub = self.subscribe()
+        try:
+            while not sub.closed:
+                frame = sub.get(timeout=1.0)
+                if frame is not None:
+                    yield (b'--frame\r\n'
+                           b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        finally:
+            self.unsubscribe(sub)
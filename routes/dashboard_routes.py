@@ -1,7 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from services.inventory_service import dashboard_stats
-from db.connection import db_cursor
+from services.auth_service import invalidate_user_cache
+from services.rollups import rebuild_item_activity, retract_event_rollups
+from services.retention import purge_events, touched_item_ids
+from db.connection import db_cursor, pool_stats
 from werkzeug.security import generate_password_hash
 
 dashboard_bp = Blueprint("dashboard", __name__)
@@ -18,6 +21,14 @@ def dashboard():
             stats['total_users'] = user_count['total_users'] if user_count else 0
     return render_template("dashboard.html", stats=stats, user=current_user)
 
+@dashboard_bp.route("/admin/db/pool")
+@login_required
+def db_pool_stats():
+    """Connection pool counters, used to size DB_POOL_SIZE / DB_POOL_MAX_OVERFLOW"""
+    if current_user.role != 'ADMIN':
+        return jsonify({"error": "Admin privileges required."}), 403
+    return jsonify(pool_stats())
+
 @dashboard_bp.route("/users")
 @login_required
 def manage_users():
@@ -57,6 +68,7 @@ def add_user():
                 VALUES (%s, %s, %s, %s, %s)
             """, (first_name, last_name, email, pwd_hash, role))
             conn.commit()
+        invalidate_user_cache()
         flash("User added successfully.", "success")
     except Exception as e:
         flash(f"Error adding user: {str(e)}", "danger")
@@ -85,6 +97,7 @@ def toggle_user_status(user_id):
             new_status = 0 if row["is_active"] else 1
             cur.execute("UPDATE users SET is_active=%s WHERE id=%s", (new_status, user_id))
             conn.commit()
+        invalidate_user_cache()
         
         status_text = "enabled" if new_status else "disabled"
         flash(f"User account {status_text} successfully.", "success")
@@ -115,12 +128,18 @@ def delete_user(user_id):
             
             user_name = f"{user_row['first_name']} {user_row['last_name']}"
             
-            # Delete warehouse_events first to avoid FK constraint
-            cur.execute("DELETE FROM warehouse_events WHERE user_id=%s", (user_id,))
+            # Items whose latest movement may have been made by this user
+            touched_items = touched_item_ids(cur, user_id)
+
+            # Delete warehouse_events (live and archived) first to avoid FK constraint
+            retract_event_rollups(cur, "user_id", user_id)
+            purge_events(cur, "user_id", user_id)
+            rebuild_item_activity(cur, touched_items)
             
             # Delete the user
             cur.execute("DELETE FROM users WHERE id=%s", (user_id,))
             conn.commit()
+        invalidate_user_cache()
         
         flash(f"User {user_name} deleted successfully.", "success")
     except Exception as e:
@@ -0,0 +1,71 @@
+from datetime import date
+from flask import Blueprint, Response, request, jsonify, abort
+from flask_login import login_required, current_user
+from services.export_service import iter_inventory, iter_events, ENCODERS
+from services.statistics_service import (
+    get_quantity_changes,
+    get_top_added_items,
+    get_top_removed_items,
+    get_activity_by_day,
+    get_activity_by_type,
+    get_statistics_summary
+)
+
+export_bp = Blueprint("export", __name__)
+
+STATISTICS = {
+    "quantity_changes": get_quantity_changes,
+    "top_added": get_top_added_items,
+    "top_removed": get_top_removed_items,
+    "activity_by_day": get_activity_by_day,
+    "activity_by_type": get_activity_by_type,
+    "summary": get_statistics_summary,
+}
+
+def _stream(rows, name, fmt):
+    if fmt not in ENCODERS:
+        abort(404)
+    encode, mimetype = ENCODERS[fmt]
+    return Response(
+        encode(rows),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={name}-{date.today()}.{fmt}"},
+    )
+
+def _date_arg(name):
+    value = request.args.get(name)
+    return date.fromisoformat(value) if value else None
+
+@export_bp.route("/export/inventory.<fmt>")
+@login_required
+def export_inventory(fmt):
+    if current_user.role != 'ADMIN':
+        return jsonify({"error": "Admin privileges required."}), 403
+    return _stream(iter_inventory(), "inventory", fmt)
+
+@export_bp.route("/export/events.<fmt>")
+@login_required
+def export_events(fmt):
+    """Full event log, optionally filtered by ?item_id=&since=YYYY-MM-DD&until=YYYY-MM-DD"""
+    if current_user.role != 'ADMIN':
+        return jsonify({"error": "Admin privileges required."}), 403
+    try:
+        since, until = _date_arg("since"), _date_arg("until")
+    except ValueError:
+        return jsonify({"error": "since/until must be YYYY-MM-DD"}), 400
+    rows = iter_events(item_id=request.args.get("item_id", type=int), since=since, until=until)
+    return _stream(rows, "events", fmt)
+
+@export_bp.route("/export/statistics/<name>.<fmt>")
+@login_required
+def export_statistics(name, fmt):
+    if current_user.role != 'ADMIN':
+        return jsonify({"error": "Admin privileges required."}), 403
+    if name not in STATISTICS:
+        abort(404)
+    days = request.args.get("days", 30, type=int)
+    if days not in [7, 30, 90]:
+        days = 30
+    result = STATISTICS[name](days=days)
+    rows = [result] if isinstance(result, dict) else (result or [])
+    return _stream(iter(rows), f"{name}-{days}d", fmt)
@@ -1,14 +1,27 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import os
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from services.inventory_service import list_inventory, add_item, ALLOWED_TYPES
+from services.inventory_service import list_inventory_page, add_item, invalidate_qr_cache, ALLOWED_TYPES
+from services.import_service import read_rows, import_items
 
 inventory_bp = Blueprint("inventory", __name__)
 
 @inventory_bp.route("/inventory")
 @login_required
 def inventory():
-    items = list_inventory()
-    return render_template("inventory.html", items=items, allowed_types=sorted(ALLOWED_TYPES))
+    sort_by = request.args.get("sort", "name")
+    order = request.args.get("order", "asc")
+    per_page = request.args.get("per_page", type=int)
+    try:
+        page = list_inventory_page(
+            sort=sort_by, order=order, limit=per_page,
+            after=request.args.get("after"), before=request.args.get("before"),
+        )
+    except ValueError as e:
+        flash(str(e), "warning")
+        return redirect(url_for("inventory.inventory", sort=sort_by, order=order, per_page=per_page))
+    return render_template("inventory.html", items=page.items, page=page, allowed_types=sorted(ALLOWED_TYPES),
+                           sort_by=sort_by, order=order, per_page=per_page)
 
 @inventory_bp.route("/inventory/add", methods=["POST"])
 @login_required
@@ -30,6 +43,24 @@ def inventory_add():
         flash(f"Failed to add item: {e}", "danger")
     return redirect(url_for("inventory.inventory"))
 
+@inventory_bp.route("/inventory/import", methods=["POST"])
+@login_required
+def inventory_import():
+    """Bulk upsert items from an uploaded CSV / JSON / NDJSON file; returns a per-row report"""
+    if current_user.role != 'ADMIN':
+        return jsonify({"error": "Admin privileges required."}), 403
+
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"error": "No file uploaded."}), 400
+
+    fmt = request.form.get("format") or os.path.splitext(upload.filename)[1].lstrip(".").lower()
+    try:
+        report = import_items(read_rows(upload.stream, fmt), warehouse_id=request.form.get("warehouse_id", type=int))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(report.to_dict())
+
 @inventory_bp.route("/inventory/delete/<int:item_id>", methods=["POST"])
 @login_required
 def delete_item(item_id):
@@ -39,20 +70,26 @@ def delete_item(item_id):
     
     try:
         from db.connection import db_cursor
+        from services.rollups import retract_event_rollups, adjust_stock_totals_for_item
+        from services.retention import purge_events
         with db_cursor() as (conn, cur):
             # Check if item exists
-            cur.execute("SELECT name FROM items WHERE id=%s", (item_id,))
+            cur.execute("SELECT name, qr_code FROM items WHERE id=%s", (item_id,))
             item = cur.fetchone()
             if not item:
                 flash("Item not found.", "danger")
                 return redirect(url_for('inventory.inventory'))
             
             # Delete warehouse events first
-            cur.execute("DELETE FROM warehouse_events WHERE item_id=%s", (item_id,))
+            retract_event_rollups(cur, "item_id", item_id)
+            purge_events(cur, "item_id", item_id)
+            adjust_stock_totals_for_item(cur, item_id, -1)
             
             # Delete the item
             cur.execute("DELETE FROM items WHERE id=%s", (item_id,))
             conn.commit()
+        if item["qr_code"]:
+            invalidate_qr_cache(item["qr_code"])
         
         flash(f"Item '{item['name']}' deleted successfully.", "success")
     except Exception as e:
@@ -6,9 +6,10 @@ from services.statistics_service import (
     get_top_removed_items,
     get_activity_by_day,
     get_activity_by_type,
-    get_statistics_summary
+    get_statistics_summary,
+    get_low_stock_items
 )
-from db.connection import db_cursor
+from services.report_executor import run_report
 
 reports_bp = Blueprint("reports", __name__)
 
@@ -25,31 +26,16 @@ def reports():
     if days not in [7, 30, 90]:
         days = 30
     
-    # Get all statistics data
-    summary = get_statistics_summary(days=days)
-    daily_activity = get_activity_by_day(days=days)
-    type_activity = get_activity_by_type(days=days)
-    top_added = get_top_added_items(days=days, limit=5)
-    top_removed = get_top_removed_items(days=days, limit=5)
+    # Independent queries run concurrently; slow or failing sections fall back to empty
+    report = run_report({
+        "summary": (get_statistics_summary, {"days": days}, {}),
+        "daily_activity": (get_activity_by_day, {"days": days}, []),
+        "type_activity": (get_activity_by_type, {"days": days}, []),
+        "top_added": (get_top_added_items, {"days": days, "limit": 5}, []),
+        "top_removed": (get_top_removed_items, {"days": days, "limit": 5}, []),
+        "low_stock": (get_low_stock_items, {"limit": 10}, []),
+    })
+    if report.missing:
+        flash("Some report sections could not be loaded: " + ", ".join(report.missing), "warning")
     
-    # Get low stock items
-    with db_cursor() as (_, cur):
-        cur.execute("""
-            SELECT name, type, quantity, min_quantity
-            FROM items
-            WHERE quantity < min_quantity AND quantity > 0
-            ORDER BY (quantity / min_quantity) ASC
-            LIMIT 10
-        """)
-        low_stock = cur.fetchall()
-    
-    return render_template(
-        "reports.html",
-        days=days,
-        summary=summary,
-        daily_activity=daily_activity,
-        type_activity=type_activity,
-        top_added=top_added,
-        top_removed=top_removed,
-        low_stock=low_stock
-    )
+    return render_template("reports.html", days=days, **report)
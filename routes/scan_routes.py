@@ -1,12 +1,17 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, jsonify, session
 from flask_login import login_required, current_user
-from qr.qr_scanner import VideoCamera, generate_frames
-from services.inventory_service import get_item_details_by_qr, get_item_events, apply_stock_action
+import json
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from qr.qr_scanner import FrameBroadcaster, qr_detections
+from config import Config
+from qr.batch_decode import iter_images, decode_images
+from services.inventory_service import get_item_with_events_by_qr, resolve_qr_codes, apply_stock_action, apply_stock_batch, StockBatchError
 
 scan_bp = Blueprint("scan", __name__)
 
-# Global camera instance
-camera = None
+# One camera shared by every /video_feed viewer, opened on demand
+broadcaster = FrameBroadcaster()
 
 @scan_bp.route("/scan")
 @login_required
@@ -26,12 +31,11 @@ def scan_manual():
         flash("Please enter a QR code", "warning")
         return redirect(url_for("scan.scan"))
 
-    item = get_item_details_by_qr(qr_code)
+    item, events = get_item_with_events_by_qr(qr_code, limit=15)
     if not item:
         flash(f"No item found for QR: {qr_code}", "danger")
         return redirect(url_for("scan.scan"))
 
-    events = get_item_events(item["id"], limit=15)
     return render_template("item_detail.html", item=item, events=events)
 
 @scan_bp.route("/scan/camera")
@@ -44,26 +48,77 @@ def scan_camera():
 @login_required
 def video_feed():
     """Video streaming route"""
-    global camera
-    if camera is None:
-        camera = VideoCamera()
-    return Response(generate_frames(camera),
+    return Response(broadcaster.stream(),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @scan_bp.route("/get_qr_code")
 @login_required
 def get_qr_code():
-    """Get the last detected QR code"""
-    global camera
+    """Get the last detected QR code (polling fallback for /scan/events)"""
+    camera = broadcaster.camera
     if camera is None:
         return jsonify({"qr_code": None})
     
-    qr_code = camera.get_last_qr_code()
-    if qr_code:
-        # Reset the camera's last QR code after reading
-        camera.last_qr_code = None
-        return jsonify({"qr_code": qr_code})
-    return jsonify({"qr_code": None})
+    return jsonify({"qr_code": camera.pop_last_qr_code()})
+
+@scan_bp.route("/scan/events")
+@login_required
+def scan_events():
+    """Server-Sent Events stream of QR detections, each delivered once per open page"""
+    subscription = qr_detections.subscribe()
+
+    def stream():
+        with subscription:
+            yield "retry: 2000\n\n"
+            while True:
+                message = subscription.get(timeout=Config.SSE_KEEPALIVE)
+                if message is None:
+                    yield ": keepalive\n\n"  # also how a closed connection is noticed
+                    continue
+                event_id, payload = message
+                yield f"id: {event_id}\nevent: qr\ndata: {json.dumps(payload)}\n\n"
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@scan_bp.route("/scan/images", methods=["POST"])
+@login_required
+def scan_images():
+    """
+    Decode QR codes from uploaded photos (multipart field "images", repeatable;
+    zip archives are expanded) and resolve them to items in bulk.
+    """
+    uploads = request.files.getlist("images")
+    if not uploads:
+        return jsonify({"error": "No images uploaded."}), 400
+
+    try:
+        images = list(iter_images((u.filename or "upload", u.read()) for u in uploads))
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        results = decode_images(images)
+    except BrokenProcessPool:
+        return jsonify({"error": "The QR decoder crashed on this batch; try again with fewer or smaller images."}), 503
+    items = resolve_qr_codes(code for r in results for code in r.codes)
+    return jsonify({
+        "images": [r.to_dict() for r in results],
+        "items": items,
+        "unresolved": sorted({code for r in results for code in r.codes} - items.keys()),
+    })
+
+@scan_bp.route("/scan/stats")
+@login_required
+def scan_stats():
+    """Camera viewers and QR detection counters (hit rate, decode latency)"""
+    if current_user.role != 'ADMIN':
+        return jsonify({"error": "Admin privileges required."}), 403
+    camera = broadcaster.camera
+    return jsonify({
+        "viewers": broadcaster.viewers(),
+        "detection": camera.detection_stats() if camera is not None else None,
+    })
 
 @scan_bp.route("/stock/<action>/<int:item_id>", methods=["POST"])
 @login_required
@@ -86,3 +141,33 @@ def stock_action(action, item_id):
 
     # reload item details by item_id -> easiest is to redirect to inventory, or you can add a /item/<id> route later
     return redirect(url_for("inventory.inventory"))
+
+
+@scan_bp.route("/stock/batch", methods=["POST"])
+@login_required
+def stock_batch():
+    """
+    Apply many stock movements in one transaction.
+    Body: {"lines": [{"item_id": 1, "action": "ADD", "quantity": 5, "note": "..."}, ...]}
+    """
+    payload = request.get_json(silent=True) or {}
+    lines = payload.get("lines")
+    if not isinstance(lines, list) or not lines:
+        return jsonify({"ok": False, "error": "Expected a non-empty 'lines' list"}), 400
+    if len(lines) > Config.STOCK_BATCH_MAX_LINES:
+        return jsonify({"ok": False, "error": f"At most {Config.STOCK_BATCH_MAX_LINES} lines per batch"}), 400
+
+    if current_user.role != 'ADMIN':
+        denied = [i for i, line in enumerate(lines)
+                  if not isinstance(line, dict) or str(line.get("action", "")).upper() != "REMOVE"]
+        if denied:
+            errors = [{"line": i + 1, "error": "Only admins can add or return stock."} for i in denied]
+            return jsonify({"ok": False, "errors": errors}), 403
+
+    try:
+        event_ids = apply_stock_batch(lines, user_id=current_user.id)
+    except StockBatchError as e:
+        errors = [{"line": i + 1, "error": msg} for i, msg in e.errors]
+        return jsonify({"ok": False, "errors": errors}), 400
+
+    return jsonify({"ok": True, "applied": len(event_ids), "event_ids": event_ids})
@@ -8,6 +8,7 @@ from services.statistics_service import (
     get_activity_by_type,
     get_statistics_summary
 )
+from services.report_executor import run_report
 
 statistics_bp = Blueprint("statistics", __name__)
 
@@ -24,21 +25,16 @@ def statistics():
     if days not in [7, 30, 90]:
         days = 30
     
-    # Get all statistics data
-    summary = get_statistics_summary(days=days)
-    quantity_changes = get_quantity_changes(days=days)
-    top_added = get_top_added_items(days=days, limit=10)
-    top_removed = get_top_removed_items(days=days, limit=10)
-    daily_activity = get_activity_by_day(days=days)
-    type_activity = get_activity_by_type(days=days)
+    # Independent queries run concurrently; slow or failing sections fall back to empty
+    report = run_report({
+        "summary": (get_statistics_summary, {"days": days}, {}),
+        "quantity_changes": (get_quantity_changes, {"days": days}, []),
+        "top_added": (get_top_added_items, {"days": days, "limit": 10}, []),
+        "top_removed": (get_top_removed_items, {"days": days, "limit": 10}, []),
+        "daily_activity": (get_activity_by_day, {"days": days}, []),
+        "type_activity": (get_activity_by_type, {"days": days}, []),
+    })
+    if report.missing:
+        flash("Some statistics could not be loaded: " + ", ".join(report.missing), "warning")
     
-    return render_template(
-        "statistics.html",
-        days=days,
-        summary=summary,
-        quantity_changes=quantity_changes,
-        top_added=top_added,
-        top_removed=top_removed,
-        daily_activity=daily_activity,
-        type_activity=type_activity
-    )
+    return render_template("statistics.html", days=days, **report)
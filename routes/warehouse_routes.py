@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from models.warehouse import Warehouse
-from services.inventory_service import list_inventory, dashboard_stats
+from services.inventory_service import dashboard_stats
 from config import Config
 
 warehouse_bp = Blueprint("warehouse", __name__)
@@ -18,24 +18,24 @@ def warehouse():
         flash("Warehouse not found", "danger")
         return redirect(url_for('dashboard.dashboard'))
     
-    # Get items
-    items = warehouse.list_items()
-    
-    # Sorting
+    # Items: sorted and paged in SQL
     sort_by = request.args.get('sort', 'name')
-    reverse = request.args.get('order', 'asc') == 'desc'
-    
-    if sort_by == 'name':
-        items.sort(key=lambda x: x.name, reverse=reverse)
-    elif sort_by == 'type':
-        items.sort(key=lambda x: x.type, reverse=reverse)
-    elif sort_by == 'quantity':
-        items.sort(key=lambda x: x.quantity, reverse=reverse)
+    order = request.args.get('order', 'asc')
+    per_page = request.args.get('per_page', type=int)
+    try:
+        page = warehouse.page_items(
+            sort=sort_by, order=order, limit=per_page,
+            after=request.args.get('after'), before=request.args.get('before'),
+        )
+    except ValueError as e:
+        flash(str(e), "warning")
+        return redirect(url_for('warehouse.warehouse', sort=sort_by, order=order, per_page=per_page))
     
     # Statistics
     stats = dashboard_stats()
     
-    return render_template("warehouse.html", warehouse=warehouse, items=items, stats=stats, sort_by=sort_by, order=request.args.get('order', 'asc'))
+    return render_template("warehouse.html", warehouse=warehouse, items=page.items, page=page, stats=stats,
+                           sort_by=sort_by, order=order, per_page=per_page)
 
 @warehouse_bp.route("/warehouse/remove/<int:item_id>", methods=["POST"])
 @login_required
@@ -1,6 +1,15 @@
+import time
 from werkzeug.security import generate_password_hash, check_password_hash
+from config import Config
 from db.connection import db_cursor
 from models.user import User
+from services.cache import TTLCache
+
+# User objects for the login_manager.user_loader, keyed by id.
+# Other workers learn about changes through the `users` row in cache_versions,
+# polled at most every USER_CACHE_VERSION_POLL seconds.
+_user_cache = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
+_user_cache_version = {"version": None, "checked_at": 0.0}
 
 def get_user_by_id(user_id: int):
     with db_cursor() as (_, cur):
@@ -11,6 +20,39 @@ def get_user_by_id(user_id: int):
         row = cur.fetchone()
         return User(**row) if row else None
 
+def _sync_user_cache():
+    now = time.monotonic()
+    if now - _user_cache_version["checked_at"] < Config.USER_CACHE_VERSION_POLL:
+        return
+    _user_cache_version["checked_at"] = now
+    with db_cursor() as (_, cur):
+        cur.execute("SELECT version FROM cache_versions WHERE name='users'")
+        row = cur.fetchone()
+    version = row["version"] if row else 0
+    if version != _user_cache_version["version"]:
+        _user_cache.clear()
+        _user_cache_version["version"] = version
+
+def get_cached_user(user_id: int):
+    """get_user_by_id() served from the in-process cache when possible"""
+    _sync_user_cache()
+    user = _user_cache.get(user_id)
+    if user is None:
+        user = get_user_by_id(user_id)
+        if user is not None:
+            _user_cache.put(user_id, user)
+    return user
+
+def invalidate_user_cache():
+    """Call after changing or deleting users; bumps the shared version for other workers"""
+    with db_cursor() as (conn, cur):
+        cur.execute("""
+            INSERT INTO cache_versions (name, version) VALUES ('users', 1)
+            ON DUPLICATE KEY UPDATE version = version + 1
+        """)
+        conn.commit()
+    _user_cache.clear()
+
 def get_user_by_email(email: str):
     with db_cursor() as (_, cur):
         cur.execute("""
@@ -0,0 +1,95 @@
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache with an optional per-entry time-to-live.
+
+      - maxsize: entries kept before the least recently used one is evicted
+      - ttl:     seconds an entry stays valid (None = until evicted/invalidated)
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[1] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+def watermark_cached(watermark, maxsize=256):
+    """
+    Memoize a function whose result only changes when watermark() does.
+
+    watermark(arguments) receives the call's bound arguments (defaults applied)
+    and returns a cheap comparable token; a cached result is served only while
+    the token is unchanged. Arguments must be hashable.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        cache = TTLCache(maxsize=maxsize)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments.items())
+            # read the mark before computing, so a concurrent write can only
+            # make the stored entry look older than it is
+            mark = watermark(bound.arguments)
+            entry = cache.get(key)
+            if entry is not None and entry[0] == mark:
+                return entry[1]
+            value = fn(*args, **kwargs)
+            cache.put(key, (mark, value))
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
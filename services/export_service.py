@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from config import Config
+from db.connection import stream_query, stream_queries
+
+def iter_inventory(warehouse_id=None):
+    warehouse_id = warehouse_id or Config.DEFAULT_WAREHOUSE_ID
+    return stream_query(
+        "SELECT * FROM vw_inventory WHERE warehouse_id=%s ORDER BY id",
+        (warehouse_id,),
+    )
+
+def iter_events(warehouse_id=None, item_id=None, since=None, until=None):
+    """
+    Event log rows, archived ones first, then the live log, each in id order;
+    since/until are dates (inclusive)
+    """
+    warehouse_id = warehouse_id or Config.DEFAULT_WAREHOUSE_ID
+    where, params = ["e.warehouse_id=%s"], [warehouse_id]
+    if item_id is not None:
+        where.append("e.item_id=%s")
+        params.append(item_id)
+    if since is not None:
+        where.append("e.timestamp_created >= %s")
+        params.append(since)
+    if until is not None:
+        where.append("e.timestamp_created < %s + INTERVAL 1 DAY")
+        params.append(until)
+    queries = [
+        (f"""
+            SELECT e.*, CONCAT(u.first_name, ' ', u.last_name) as user_name
+            FROM {table} e
+            JOIN users u ON u.id = e.user_id
+            WHERE {' AND '.join(where)}
+            ORDER BY e.id
+        """, tuple(params))
+        for table in ("warehouse_events_archive", "warehouse_events")
+    ]
+    return stream_queries(queries)
+
+def _chunks(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def to_csv(rows, batch_size=None):
+    """
+    Encode dict rows as CSV text chunks; the header comes from rows.columns
+    (stream_query() results) or else the first row, so an empty stream
+    still gets one
+    """
+    buf = io.StringIO()
+    writer = None
+    for batch in _chunks(rows, batch_size or Config.EXPORT_BATCH_SIZE):
+        if writer is None:
+            writer = csv.DictWriter(buf, fieldnames=getattr(rows, "columns", None) or list(batch[0].keys()))
+            writer.writeheader()
+        writer.writerows(batch)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if writer is None and getattr(rows, "columns", None):
+        csv.writer(buf).writerow(rows.columns)
+        yield buf.getvalue()
+
+def to_ndjson(rows, batch_size=None):
+    """Encode dict rows as newline-delimited JSON chunks"""
+    for batch in _chunks(rows, batch_size or Config.EXPORT_BATCH_SIZE):
+        yield "".join(json.dumps(row, default=str) + "\n" for row in batch)
+
+ENCODERS = {
+    "csv": (to_csv, "text/csv"),
+    "ndjson": (to_ndjson, "application/x-ndjson"),
+}
@@ -0,0 +1,157 @@
+"""
+Group-commit write path for single stock movements.
+
+With STOCK_GROUP_COMMIT enabled, apply_stock_action() hands its movement to
+a writer thread instead of committing it itself. The writer collects
+movements for at most GROUP_COMMIT_MAX_DELAY seconds or GROUP_COMMIT_MAX_ROWS
+rows and applies the whole micro-batch with stock_engine.apply_movements()
+in one transaction: one locking read, one UPDATE, one multi-row event INSERT
+and a single commit (one log flush) for all of them. Each caller waits on
+its own Future, which resolves to the event id or raises the same ValueError
+the direct path would ("Not enough stock to remove", "Item not found").
+A batch that hits a non-retryable database error is re-run one movement at
+a time, so only the offending movement fails.
+"""
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from mysql.connector import Error
+from config import Config
+from db.connection import db_cursor
+from services.stock_engine import ACTIONS, RETRYABLE_ERRORS, apply_movements
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    def __init__(self, max_rows=None, max_delay=None):
+        self.max_rows = max_rows or Config.GROUP_COMMIT_MAX_ROWS
+        self.max_delay = Config.GROUP_COMMIT_MAX_DELAY if max_delay is None else max_delay
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.movements = 0
+        self._thread = threading.Thread(target=self._run, name="stock-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, item_id, user_id, action, qty, note=None, warehouse_id=None) -> Future:
+        """Queue one movement; the Future resolves to its event id"""
+        if qty <= 0:
+            raise ValueError("Quantity must be > 0")
+        if action not in ACTIONS:
+            raise ValueError("Invalid action")
+        future = Future()
+        self._queue.put(((item_id, user_id, action, qty, note, warehouse_id), future))
+        return future
+
+    def stop(self, timeout=5):
+        """Flush what is queued and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "movements": self.movements,
+                "avg_batch": round(self.movements / self.batches, 2) if self.batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+    # ---------- Writer thread ----------
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + self.max_delay
+            stopping = False
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                try:
+                    entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch):
+        batch = [(m, f) for m, f in batch if f.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            self._commit(batch)
+        except Exception as e:
+            # an unexpected error must neither kill the thread nor leave callers waiting
+            self._fail([(m, f) for m, f in batch if not f.done()], e)
+
+    def _commit(self, batch):
+        movements = [m for m, _ in batch]
+        attempt = 0
+        while True:
+            try:
+                with db_cursor() as (conn, cur):
+                    event_ids, errors = apply_movements(cur, movements)
+                    conn.commit()
+                break
+            except Error as e:
+                if e.errno in RETRYABLE_ERRORS and attempt < Config.STOCK_RETRY_ATTEMPTS:
+                    attempt += 1
+                    time.sleep(Config.STOCK_RETRY_BACKOFF * (2 ** attempt) * random.random())
+                    continue
+                if len(batch) > 1:
+                    # isolate the offending movement instead of failing the whole batch
+                    for entry in batch:
+                        self._commit([entry])
+                    return
+                self._fail(batch, e)
+                return
+            except Exception as e:
+                self._fail(batch, e)
+                return
+
+        with self._stats_lock:
+            self.batches += 1
+            self.movements += len(batch)
+        failed = dict(errors)
+        for i, (_, future) in enumerate(batch):
+            if i in failed:
+                future.set_exception(ValueError(failed[i]))
+            else:
+                future.set_result(event_ids[i])
+
+    @staticmethod
+    def _fail(batch, error):
+        logger.exception("group commit of %d movements failed", len(batch))
+        for _, future in batch:
+            future.set_exception(error)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_group_writer() -> GroupCommitWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.alive:
+            _writer = GroupCommitWriter()
+            atexit.register(_writer.stop)
+        return _writer
@@ -0,0 +1,241 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from mysql.connector import Error
+from config import Config
+from db.connection import db_cursor
+from services.inventory_service import ALLOWED_TYPES, new_sku, invalidate_qr_cache
+from services.rollups import adjust_stock_totals_many
+
+# Existing SKUs get their catalogue fields refreshed; quantity is only set for
+# new items, stock changes for existing ones go through the movement log.
+# Optional fields left empty in the file keep their current value; for
+# min_quantity (NOT NULL) _upsert() fills that value in itself, 5 for new items.
+_UPSERT_SQL = """
+    INSERT INTO items (sku, warehouse_id, name, description, type, quantity, min_quantity, location, qr_code)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        name = VALUES(name),
+        description = COALESCE(VALUES(description), description),
+        type = VALUES(type),
+        min_quantity = VALUES(min_quantity),
+        location = COALESCE(VALUES(location), location),
+        qr_code = COALESCE(VALUES(qr_code), qr_code)
+"""
+
+
+class _InvalidRow:
+    """Stands in for an input line that could not be parsed; rejected by _clean()"""
+
+    def __init__(self, message):
+        self.message = message
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)  # (row_number, message)
+
+    def to_dict(self):
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": len(self.errors),
+            "errors": [{"row": row, "error": msg} for row, msg in self.errors],
+        }
+
+
+def read_rows(stream, fmt):
+    """
+    Yield raw row dicts from a binary stream.
+    fmt: 'csv' (header row required), 'ndjson' (one object per line) or
+    'json' (a top-level array, parsed in one go).
+    """
+    if fmt == "json":
+        data = json.load(io.TextIOWrapper(stream, encoding="utf-8-sig"))
+        if not isinstance(data, list):
+            raise ValueError("JSON import must be an array of objects")
+        yield from data
+    elif fmt == "ndjson":
+        for line in io.TextIOWrapper(stream, encoding="utf-8-sig"):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield _InvalidRow(f"Invalid JSON: {e.msg}")
+    elif fmt == "csv":
+        yield from csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    else:
+        raise ValueError("Unsupported import format")
+
+
+def _clean(raw, warehouse_id):
+    """Validate one raw row; returns the column tuple or raises ValueError."""
+    if isinstance(raw, _InvalidRow):
+        raise ValueError(raw.message)
+    if not isinstance(raw, dict):
+        raise ValueError("Row is not an object")
+
+    def text(key):
+        value = raw.get(key)
+        return str(value).strip() if value not in (None, "") else None
+
+    def number(key, default):
+        # an explicit 0 is a value, only a missing / empty field takes the default
+        value = raw.get(key)
+        return default if value is None or (isinstance(value, str) and not value.strip()) else int(value)
+
+    name = text("name")
+    if not name:
+        raise ValueError("name is required")
+    type_ = (text("type") or "").upper()
+    if type_ not in ALLOWED_TYPES:
+        raise ValueError(f"Invalid type {type_!r}")
+    try:
+        quantity = number("quantity", 0)
+        min_quantity = number("min_quantity", None)  # None: keep the stored value, see _upsert()
+    except (TypeError, ValueError):
+        raise ValueError("quantity and min_quantity must be integers")
+    if quantity < 0 or (min_quantity is not None and min_quantity < 0):
+        raise ValueError("quantity and min_quantity must be >= 0")
+
+    return (
+        text("sku") or new_sku(),
+        warehouse_id,
+        name,
+        text("description"),
+        type_,
+        quantity,
+        min_quantity,
+        text("location"),
+        text("qr_code"),
+    )
+
+
+def import_items(rows, warehouse_id=None, chunk_size=None):
+    """
+    Upsert items by SKU from an iterable of row dicts.
+    Rows are validated one by one and written in chunks, one transaction and
+    one executemany() (sent as a multi-row INSERT) per chunk. Invalid rows are
+    skipped and listed in the returned ImportReport.
+    """
+    warehouse_id = warehouse_id or Config.DEFAULT_WAREHOUSE_ID
+    chunk_size = chunk_size or Config.IMPORT_CHUNK_SIZE
+    report = ImportReport()
+    seen_skus, seen_qr_codes = set(), set()
+    chunk = []
+
+    for row_number, raw in enumerate(rows, start=1):
+        try:
+            values = _clean(raw, warehouse_id)
+        except ValueError as e:
+            report.errors.append((row_number, str(e)))
+            continue
+        if values[0] in seen_skus:
+            report.errors.append((row_number, f"Duplicate SKU {values[0]!r} in file"))
+            continue
+        if values[8] is not None and values[8] in seen_qr_codes:
+            report.errors.append((row_number, f"Duplicate QR code {values[8]!r} in file"))
+            continue
+        seen_skus.add(values[0])
+        if values[8] is not None:
+            seen_qr_codes.add(values[8])
+        chunk.append((row_number, values))
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, report)
+            chunk = []
+
+    if chunk:
+        _write_chunk(chunk, report)
+    if report.updated:
+        invalidate_qr_cache()  # updated rows may have had their qr_code reassigned
+    return report
+
+
+def _write_chunk(chunk, report):
+    try:
+        inserted, updated, rejected = _upsert(chunk)
+    except Error as e:
+        if len(chunk) == 1:
+            report.errors.append((chunk[0][0], str(e)))
+            return
+        # isolate the offending rows instead of failing the whole chunk
+        for entry in chunk:
+            _write_chunk([entry], report)
+        return
+    report.inserted += inserted
+    report.updated += updated
+    report.errors.extend(rejected)
+
+
+def _select_by_sku(cur, skus):
+    cur.execute(f"""
+        SELECT id, sku, warehouse_id, quantity, min_quantity
+        FROM items
+        WHERE sku IN ({", ".join(["%s"] * len(skus))})
+        FOR UPDATE
+    """, skus)
+    return {row["sku"]: row for row in cur.fetchall()}
+
+
+def _qr_code_conflicts(cur, chunk):
+    """
+    Rows whose qr_code already belongs to another SKU. ON DUPLICATE KEY
+    UPDATE fires on any unique key, so such a row would otherwise update
+    the item owning the QR code instead of its own.
+    """
+    qr_codes = [values[8] for _, values in chunk if values[8] is not None]
+    if not qr_codes:
+        return []
+    cur.execute(f"""
+        SELECT sku, qr_code FROM items
+        WHERE qr_code IN ({", ".join(["%s"] * len(qr_codes))})
+        FOR UPDATE
+    """, qr_codes)
+    owners = {row["qr_code"]: row["sku"] for row in cur.fetchall()}
+    return [
+        (row_number, f"QR code {values[8]!r} already belongs to SKU {owners[values[8]]!r}")
+        for row_number, values in chunk
+        if values[8] in owners and owners[values[8]] != values[0]
+    ]
+
+
+def _with_min_quantity(values, before):
+    """values with a missing min_quantity replaced by the stored one (5 for a new item)"""
+    if values[6] is not None:
+        return values
+    old = before.get(values[0])
+    return values[:6] + (old["min_quantity"] if old else 5,) + values[7:]
+
+
+def _upsert(chunk):
+    """Write one chunk; returns (inserted, updated, rejected rows as (row_number, message))"""
+    with db_cursor() as (conn, cur):
+        rejected = _qr_code_conflicts(cur, chunk)
+        if rejected:
+            rejected_rows = {row_number for row_number, _ in rejected}
+            chunk = [entry for entry in chunk if entry[0] not in rejected_rows]
+            if not chunk:
+                return 0, 0, rejected
+        skus = [values[0] for _, values in chunk]
+        before = _select_by_sku(cur, skus)
+        cur.executemany(_UPSERT_SQL, [_with_min_quantity(values, before) for _, values in chunk])
+        after = _select_by_sku(cur, skus)
+
+        deltas = []
+        for sku, row in after.items():
+            is_low = int(row["quantity"] < row["min_quantity"])
+            old = before.get(sku)
+            if old is None:
+                deltas.append((row["warehouse_id"], row["id"], 1, row["quantity"], is_low))
+            else:
+                # always a delta, even a zero one: a changed name or type must
+                # move write_version so cached statistics are recomputed
+                was_low = int(old["quantity"] < old["min_quantity"])
+                deltas.append((row["warehouse_id"], row["id"], 0, 0, is_low - was_low))
+        adjust_stock_totals_many(cur, deltas)
+        conn.commit()
+
+    return len(skus) - len(before), len(before), rejected
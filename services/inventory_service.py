@@ -1,14 +1,58 @@
-from db.connection import db_cursor
+import uuid
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from db.connection import db_cursor, in_outer_transaction
 from config import Config
+from services.rollups import adjust_stock_totals_for_item
+from services.stock_engine import apply_movement, apply_movements
+from services.group_commit import get_group_writer
+from services.pagination import fetch_page
+from services.cache import TTLCache
 
 ALLOWED_TYPES = {
     "BATTERY","FIN","CONTROLLER","MOTOR","ESC","FRAME","PROPELLER","CAMERA","DRONE","OTHER"
 }
 
+# qr_code -> item id for the scan path; see get_item_with_events_by_qr
+_qr_item_ids = TTLCache(maxsize=Config.QR_CACHE_SIZE, ttl=Config.QR_CACHE_TTL)
+
+# columns the item lists may be sorted by; each has a (warehouse_id, column) index
+SORT_COLUMNS = ("name", "type", "quantity")
+
+def new_sku():
+    """Generate a unique SKU for items created without one"""
+    return f"ITEM{uuid.uuid4().hex[:8].upper()}"
+
 def dashboard_stats(warehouse_id: int = None):
     warehouse_id = warehouse_id or Config.DEFAULT_WAREHOUSE_ID
+    # same columns as vw_dashboard_warehouse, read straight from the counter
+    # tables so both halves are primary-key range lookups
     with db_cursor() as (_, cur):
-        cur.execute("SELECT * FROM vw_dashboard_warehouse WHERE warehouse_id=%s", (warehouse_id,))
+        cur.execute("""
+            SELECT 
+                t.warehouse_id,
+                t.total_items,
+                t.total_quantity,
+                t.low_stock_items,
+                COALESCE(c.events_today, 0) as events_today,
+                COALESCE(c.inbound_qty_today, 0) as inbound_qty_today,
+                COALESCE(c.outbound_qty_today, 0) as outbound_qty_today
+            FROM (
+                SELECT warehouse_id,
+                       CAST(SUM(total_items) AS SIGNED) as total_items,
+                       CAST(SUM(total_quantity) AS SIGNED) as total_quantity,
+                       CAST(SUM(low_stock_items) AS SIGNED) as low_stock_items
+                FROM warehouse_stock_totals
+                WHERE warehouse_id=%s
+                GROUP BY warehouse_id
+            ) t
+            CROSS JOIN (
+                SELECT CAST(SUM(event_count) AS SIGNED) as events_today,
+                       CAST(SUM(CASE WHEN action = 'ADD' THEN quantity ELSE 0 END) AS SIGNED) as inbound_qty_today,
+                       CAST(SUM(CASE WHEN action = 'REMOVE' THEN quantity ELSE 0 END) AS SIGNED) as outbound_qty_today
+                FROM warehouse_daily_counters
+                WHERE warehouse_id=%s AND day = CURDATE()
+            ) c
+        """, (warehouse_id, warehouse_id))
         return cur.fetchone()
 
 def list_inventory(warehouse_id: int = None):
@@ -21,11 +65,116 @@ def list_inventory(warehouse_id: int = None):
         """, (warehouse_id,))
         return cur.fetchall()
 
+def list_inventory_page(warehouse_id: int = None, sort="name", order="asc", limit=None, after=None, before=None):
+    """One page of in-stock items, sorted in SQL; see services/pagination.py"""
+    warehouse_id = warehouse_id or Config.DEFAULT_WAREHOUSE_ID
+    if sort not in SORT_COLUMNS:
+        sort = "name"
+    with db_cursor() as (_, cur):
+        return fetch_page(
+            cur, "SELECT * FROM vw_inventory",
+            ["warehouse_id=%s", "quantity > 0"], [warehouse_id],
+            sort, descending=(order == "desc"),
+            limit=limit, after=after, before=before,
+        )
+
 def get_item_details_by_qr(qr_code: str):
     with db_cursor() as (_, cur):
         cur.execute("SELECT * FROM vw_item_details WHERE qr_code=%s", (qr_code,))
         return cur.fetchone()
 
+# item details plus its latest events in one statement: one row per event,
+# item columns repeated (a single row with NULL event columns if it has none).
+# ROW_NUMBER() rather than a LATERAL join so it also runs on the SQLite backend;
+# {where} appears twice, so its params are passed twice (see _item_with_events)
+_ITEM_WITH_EVENTS_SQL = """
+    SELECT d.*,
+           e.id as event_id,
+           e.action as event_action,
+           e.quantity as event_quantity,
+           e.note as event_note,
+           e.timestamp_created as event_timestamp_created,
+           e.user_name as event_user_name
+    FROM vw_item_details d
+    LEFT JOIN (
+        SELECT we.id, we.item_id, we.action, we.quantity, we.note, we.timestamp_created,
+               CONCAT(u.first_name, ' ', u.last_name) as user_name,
+               ROW_NUMBER() OVER (PARTITION BY we.item_id
+                                  ORDER BY we.timestamp_created DESC, we.id DESC) as rn
+        FROM warehouse_events we
+        JOIN users u ON u.id = we.user_id
+        WHERE we.item_id IN (SELECT d.id FROM items d WHERE {where})
+    ) e ON e.item_id = d.id AND e.rn <= %s
+    WHERE {where}
+    ORDER BY e.timestamp_created DESC, e.id DESC
+"""
+
+def _item_with_events(cur, where, params, limit):
+    cur.execute(_ITEM_WITH_EVENTS_SQL.format(where=where), (*params, limit, *params))
+    return _split_item_rows(cur.fetchall())
+
+def _split_item_rows(rows):
+    item, events = None, []
+    for row in rows:
+        if item is None:
+            item = {k: v for k, v in row.items() if not k.startswith("event_")}
+        if row["event_id"] is not None:
+            events.append({
+                "id": row["event_id"],
+                "item_id": item["id"],
+                "action": row["event_action"],
+                "quantity": row["event_quantity"],
+                "note": row["event_note"],
+                "timestamp_created": row["event_timestamp_created"],
+                "user_name": row["event_user_name"],
+            })
+    return item, events
+
+def get_item_with_events_by_qr(qr_code: str, limit: int = 15):
+    """
+    Scan fast path: (item details, latest events) for a QR code in one round trip,
+    or (None, []). A cached item id turns the lookup into a primary-key read; the
+    row's qr_code is re-checked, so a stale entry just falls back to the
+    uq_items_qr_code index.
+    """
+    with db_cursor() as (_, cur):
+        item_id = _qr_item_ids.get(qr_code)
+        if item_id is not None:
+            item, events = _item_with_events(cur, "d.id = %s AND d.qr_code = %s", (item_id, qr_code), limit)
+            if item is not None:
+                return item, events
+            _qr_item_ids.pop(qr_code)
+
+        item, events = _item_with_events(cur, "d.qr_code = %s", (qr_code,), limit)
+    if item is not None:
+        _qr_item_ids.put(qr_code, item["id"])
+    return item, events
+
+def resolve_qr_codes(qr_codes, chunk_size=1000):
+    """Bulk QR lookup: {qr_code: item row} for the codes that match an item"""
+    qr_codes = list(dict.fromkeys(qr_codes))
+    found = {}
+    with db_cursor() as (_, cur):
+        for start in range(0, len(qr_codes), chunk_size):
+            chunk = qr_codes[start:start + chunk_size]
+            cur.execute(f"""
+                SELECT id, sku, name, type, quantity, min_quantity, location, warehouse_id, qr_code
+                FROM items
+                WHERE qr_code IN ({", ".join(["%s"] * len(chunk))})
+            """, chunk)
+            for row in cur.fetchall():
+                found[row["qr_code"]] = row
+    for qr_code, row in found.items():
+        _qr_item_ids.put(qr_code, row["id"])
+    return found
+
+def invalidate_qr_cache(qr_code: str = None):
+    """Forget one QR code's cached item id, or all of them"""
+    if qr_code is None:
+        _qr_item_ids.clear()
+    else:
+        _qr_item_ids.pop(qr_code)
+
 def get_item_events(item_id: int, limit: int = 20):
     with db_cursor() as (_, cur):
         cur.execute("""
@@ -41,44 +190,84 @@ def add_item(name, description, type_, quantity, qr_code, warehouse_id=None):
     if type_ not in ALLOWED_TYPES:
         raise ValueError("Invalid type")
     
-    # Generate unique SKU
-    import uuid
-    sku = f"ITEM{uuid.uuid4().hex[:8].upper()}"
+    sku = new_sku()
+    qr_code = qr_code or None  # qr_code is unique; items without one store NULL
     
     with db_cursor() as (conn, cur):
         cur.execute("""
             INSERT INTO items (sku, warehouse_id, name, description, type, quantity, qr_code)
             VALUES (%s,%s,%s,%s,%s,%s,%s)
         """, (sku, warehouse_id, name, description, type_, int(quantity), qr_code))
+        adjust_stock_totals_for_item(cur, cur.lastrowid, +1)
         conn.commit()
+    if qr_code:
+        invalidate_qr_cache(qr_code)
 
 def apply_stock_action(item_id: int, user_id: int, action: str, qty: int, note: str = None):
     """
     action: ADD / REMOVE / RETURN
     qty must be positive
     updates items.quantity and inserts warehouse_events in one transaction
-    """
-    if qty <= 0:
-        raise ValueError("Quantity must be > 0")
-    if action not in ("ADD", "REMOVE", "RETURN"):
-        raise ValueError("Invalid action")
+    (see services/stock_engine.py)
 
-    delta = qty if action in ("ADD", "RETURN") else -qty
+    With STOCK_GROUP_COMMIT the movement is committed together with others
+    by the group-commit writer (services/group_commit.py); the call still
+    blocks until its own outcome is known.
+    """
+    if Config.STOCK_GROUP_COMMIT and not in_outer_transaction():
+        future = get_group_writer().submit(item_id, user_id, action, qty, note)
+        try:
+            return future.result(timeout=Config.GROUP_COMMIT_TIMEOUT)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise FutureTimeoutError("Stock movement timed out before it was written; nothing changed") from None
+        # already being written: it may still commit, so wait once more for the
+        # real outcome, but never indefinitely on a stuck writer
+        try:
+            return future.result(timeout=Config.GROUP_COMMIT_TIMEOUT)
+        except FutureTimeoutError:
+            raise FutureTimeoutError("Stock movement is still being written; its outcome is unknown") from None
+    return apply_movement(item_id, user_id, action, qty, note)
 
-    with db_cursor() as (_, cur):
-        # lock item row to avoid race conditions
-        cur.execute("SELECT id, warehouse_id, quantity FROM items WHERE id=%s FOR UPDATE", (item_id,))
-        row = cur.fetchone()
-        if not row:
-            raise ValueError("Item not found")
+class StockBatchError(ValueError):
+    """One or more batch lines are invalid; nothing was written."""
 
-        new_qty = row["quantity"] + delta
-        if new_qty < 0:
-            raise ValueError("Not enough stock to remove")
+    def __init__(self, errors):
+        # errors: list of (line_index, message)
+        super().__init__("; ".join(f"line {i + 1}: {msg}" for i, msg in errors))
+        self.errors = errors
 
-        cur.execute("UPDATE items SET quantity=%s WHERE id=%s", (new_qty, item_id))
+def apply_stock_batch(lines, user_id: int):
+    """
+    Apply many ADD / REMOVE / RETURN lines in one transaction.
+    lines: dicts with item_id, action, quantity and optional note, applied in order.
+    Every line is validated before anything is written; item rows are locked in
+    ascending id order so concurrent batches cannot deadlock on each other.
+    Returns the ids of the inserted warehouse_events.
+    """
+    parsed, errors = [], []
+    for i, line in enumerate(lines):
+        try:
+            item_id = int(line["item_id"])
+            qty = int(line["quantity"])
+            action = str(line["action"]).upper()
+        except (KeyError, TypeError, ValueError):
+            errors.append((i, "item_id, action and quantity are required"))
+            continue
+        if action not in ("ADD", "REMOVE", "RETURN"):
+            errors.append((i, "Invalid action"))
+        elif qty <= 0:
+            errors.append((i, "Quantity must be > 0"))
+        else:
+            parsed.append((item_id, action, qty, str(line.get("note") or "").strip() or None))
+    if errors:
+        raise StockBatchError(errors)
+    if not parsed:
+        return []
 
-        cur.execute("""
-            INSERT INTO warehouse_events (warehouse_id, item_id, user_id, action, quantity, note)
-            VALUES (%s,%s,%s,%s,%s,%s)
-        """, (row["warehouse_id"], item_id, user_id, action, qty, note))
+    movements = [(item_id, user_id, action, qty, note, None) for item_id, action, qty, note in parsed]
+    with db_cursor(savepoint=True) as (_, cur):
+        event_ids, errors = apply_movements(cur, movements, atomic=True)
+        if errors:
+            raise StockBatchError(errors)
+    return event_ids
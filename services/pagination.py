@@ -0,0 +1,95 @@
+"""
+Keyset pagination for the item lists.
+
+Pages are addressed by opaque cursor tokens (the sort value and id of the
+row at the page edge) instead of OFFSET, so page N costs the same as page 1
+and rows inserted or removed between requests don't shift the pages.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from typing import Optional
+from config import Config
+
+
+@dataclass
+class Page:
+    items: list = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def encode_cursor(sort_value, row_id) -> str:
+    raw = json.dumps([sort_value, row_id], default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """Returns (sort_value, row_id); raises ValueError on a malformed token."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        sort_value, row_id = json.loads(raw)
+        return sort_value, int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid page cursor")
+
+
+def clamp_page_size(limit) -> int:
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return Config.PAGE_SIZE
+    return max(1, min(limit, Config.MAX_PAGE_SIZE))
+
+
+def fetch_page(cur, select_sql, where, params, sort_column, descending=False,
+               limit=None, after=None, before=None) -> Page:
+    """
+    Keyset ("seek") pagination ordered by (sort_column, id).
+
+    select_sql is "SELECT ... FROM ..." without WHERE / ORDER BY; where is a
+    list of conditions ANDed together. after / before are cursor tokens from a
+    previous Page. Only limit + 1 rows are read, starting right at the cursor
+    through the (warehouse_id, sort_column) index, however deep the page is.
+    sort_column must come from a whitelist, it is interpolated.
+    """
+    limit = clamp_page_size(limit)
+    where = list(where)
+    params = list(params)
+
+    backwards = before is not None
+    token = before if backwards else after
+    # walking backwards flips both the comparison and the scan direction
+    scan_desc = descending != backwards
+    if token is not None:
+        sort_value, row_id = decode_cursor(token)
+        op = "<" if scan_desc else ">"
+        where.append(f"({sort_column} {op} %s OR ({sort_column} = %s AND id {op} %s))")
+        params.extend((sort_value, sort_value, row_id))
+
+    direction = "DESC" if scan_desc else "ASC"
+    cur.execute(f"""
+        {select_sql}
+        WHERE {" AND ".join(where) or "1=1"}
+        ORDER BY {sort_column} {direction}, id {direction}
+        LIMIT %s
+    """, (*params, limit + 1))
+    rows = cur.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    page = Page(items=rows)
+    if rows:
+        # coming back from a later page means there is always a next one
+        has_next = has_more or backwards
+        has_prev = has_more if backwards else token is not None
+        first, last = rows[0], rows[-1]
+        if has_next:
+            page.next_cursor = encode_cursor(last[sort_column], last["id"])
+        if has_prev:
+            page.prev_cursor = encode_cursor(first[sort_column], first["id"])
+    return page
@@ -0,0 +1,75 @@
+import itertools
+import threading
+from collections import deque
+
+
+class Subscription:
+    """
+    One subscriber's inbox. Every message published after subscribe() is
+    delivered to it exactly once; if the reader falls maxlen messages behind,
+    the oldest are dropped (and counted).
+    """
+
+    def __init__(self, hub, maxlen):
+        self._hub = hub
+        self._messages = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def _deliver(self, message):
+        with self._cond:
+            if len(self._messages) == self._messages.maxlen:
+                self.dropped += 1
+            self._messages.append(message)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Next (id, payload), or None on timeout / close"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._messages or self.closed, timeout=timeout)
+            return self._messages.popleft() if self._messages else None
+
+    def close(self):
+        self._hub.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PubSub:
+    """In-process fan-out: publish() hands each message to every current subscriber"""
+
+    def __init__(self, maxlen=100):
+        self.maxlen = maxlen
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self, self.maxlen)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, payload):
+        with self._lock:
+            message = (next(self._ids), payload)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub._deliver(message)
+        return len(subscribers)
+
+    def subscribers(self):
+        with self._lock:
+            return len(self._subscribers)
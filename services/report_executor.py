@@ -0,0 +1,50 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import Config
+from db.instrumentation import bind
+
+log = logging.getLogger(__name__)
+
+# Shared by every report page. Worker threads run outside the Flask app
+# context, so each query checks out its own pooled connection; bind() still
+# counts those queries towards the request's Server-Timing / N+1 stats.
+_executor = ThreadPoolExecutor(max_workers=Config.REPORT_MAX_WORKERS, thread_name_prefix="report")
+
+
+class ReportResult(dict):
+    """Section results by name; `missing` lists sections that failed or timed out."""
+
+    def __init__(self):
+        super().__init__()
+        self.missing = []
+
+
+def run_report(sections, deadline=None):
+    """
+    Run independent report queries concurrently.
+
+    sections maps a name to (fn, kwargs, fallback). Every section that has
+    not finished within `deadline` seconds, or that raised, is replaced by
+    its fallback so the page can still render the rest.
+    """
+    deadline = Config.REPORT_DEADLINE if deadline is None else deadline
+    futures = {
+        name: _executor.submit(bind(fn), **kwargs)
+        for name, (fn, kwargs, _) in sections.items()
+    }
+    wait(futures.values(), timeout=deadline)
+
+    result = ReportResult()
+    for name, future in futures.items():
+        fallback = sections[name][2]
+        if not future.done():
+            future.cancel()
+            log.warning("Report section %r missed the %ss deadline", name, deadline)
+        elif future.exception() is not None:
+            log.error("Report section %r failed", name, exc_info=future.exception())
+        else:
+            result[name] = future.result()
+            continue
+        result[name] = fallback
+        result.missing.append(name)
+    return result
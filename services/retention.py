@@ -0,0 +1,97 @@
+"""
+Hot / archive split of the event log.
+
+warehouse_events only keeps the current month plus EVENT_RETENTION_MONTHS
+whole months before it. archive_events() moves everything older to
+warehouse_events_archive in id batches, folding each batch into the
+per-item monthly summary (item_monthly_stats) in the same transaction.
+
+This stands in for native RANGE partitioning: a partitioned InnoDB table
+can't carry the foreign keys warehouse_events has. The daily rollups
+(services/rollups.py) are left untouched, so statistics are unaffected.
+"""
+from datetime import date
+from config import Config
+from db.connection import db_cursor
+from services.rollups import EVENT_TABLES, MONTH_OF_EVENT
+
+_COLUMNS = "id, warehouse_id, item_id, user_id, action, quantity, note, timestamp_created"
+
+
+def retention_cutoff(months=None, today=None) -> date:
+    """First day of the oldest month that stays in warehouse_events"""
+    months = Config.EVENT_RETENTION_MONTHS if months is None else months
+    today = today or date.today()
+    index = today.year * 12 + (today.month - 1) - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def archive_events(months=None, batch_size=None):
+    """
+    Move events older than retention_cutoff(months) to the archive.
+    Each batch is its own short transaction; returns (cutoff, events moved).
+    """
+    cutoff = retention_cutoff(months)
+    batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+    moved = 0
+    while True:
+        with db_cursor() as (conn, cur):
+            cur.execute("""
+                SELECT id FROM warehouse_events
+                WHERE timestamp_created < %s
+                ORDER BY timestamp_created, id
+                LIMIT %s
+                FOR UPDATE
+            """, (cutoff, batch_size))
+            ids = [row["id"] for row in cur.fetchall()]
+            if ids:
+                _archive_batch(cur, ids)
+                conn.commit()
+        moved += len(ids)
+        if len(ids) < batch_size:
+            return cutoff, moved
+
+
+def _archive_batch(cur, ids):
+    in_ids = f"id IN ({', '.join(['%s'] * len(ids))})"
+    cur.execute(f"""
+        INSERT INTO item_monthly_stats (item_id, month, action, warehouse_id, event_count, quantity)
+        SELECT * FROM (
+            SELECT item_id, {MONTH_OF_EVENT} AS month, action, MAX(warehouse_id) AS warehouse_id,
+                   COUNT(*) AS event_count, SUM(quantity) AS quantity
+            FROM warehouse_events
+            WHERE {in_ids}
+            GROUP BY item_id, month, action
+        ) AS m
+        ON DUPLICATE KEY UPDATE
+            event_count = item_monthly_stats.event_count + m.event_count,
+            quantity = item_monthly_stats.quantity + m.quantity
+    """, ids)
+    cur.execute(f"""
+        INSERT INTO warehouse_events_archive ({_COLUMNS})
+        SELECT {_COLUMNS} FROM warehouse_events WHERE {in_ids}
+    """, ids)
+    cur.execute(f"DELETE FROM warehouse_events WHERE {in_ids}", ids)
+
+
+def purge_events(cur, column, value):
+    """
+    Delete every event, live or archived, matching `column = value`
+    ('user_id' or 'item_id'). Runs inside the caller's transaction, after
+    retract_event_rollups(), so the counters and the log change together;
+    batching inside one transaction would hold the same locks anyway.
+    """
+    if column not in ("user_id", "item_id"):
+        raise ValueError("Invalid column")
+    for table in EVENT_TABLES:
+        cur.execute(f"DELETE FROM {table} WHERE {column} = %s", (value,))
+
+
+def touched_item_ids(cur, user_id):
+    """Items with at least one live or archived event by user_id"""
+    cur.execute("""
+        SELECT item_id FROM warehouse_events WHERE user_id = %s
+        UNION
+        SELECT item_id FROM warehouse_events_archive WHERE user_id = %s
+    """, (user_id, user_id))
+    return [row["item_id"] for row in cur.fetchall()]
@@ -0,0 +1,388 @@
+"""
+Read-side tables derived from warehouse_events.
+
+The stock-write paths call apply_event_rollups() with the ids of the events
+they just inserted, inside the same transaction, so the derived rows commit
+or roll back together with the movement itself. The rebuild_* functions
+recompute everything from the raw log, live and archived (backfill_rollups.py,
+delete_user).
+
+Warehouse-wide counters are split over COUNTER_SLOTS rows (slot = item_id %
+COUNTER_SLOTS) so concurrent movements of different items don't all queue
+on one hot row; readers SUM the slots.
+
+warehouse_stock_totals.write_version is bumped by every write that touches a
+slot; its per-warehouse SUM is the watermark that validates the statistics
+result cache (services/statistics_service.py). It only ever grows.
+"""
+
+COUNTER_SLOTS = 16
+
+# where events live: recent ones in warehouse_events, older months in the
+# archive (services/retention.py)
+EVENT_TABLES = ("warehouse_events", "warehouse_events_archive")
+
+# first day of the event's month
+MONTH_OF_EVENT = "DATE_SUB(DATE(timestamp_created), INTERVAL DAYOFMONTH(timestamp_created) - 1 DAY)"
+
+_ITEM_ACTIVITY_COLUMNS = """
+    item_id, last_in_ts, last_out_ts,
+    last_event_id, last_event_action, last_event_qty, last_event_user_id, last_event_ts
+"""
+
+
+def _newer(col):
+    # keep the existing value unless the incoming event is more recent;
+    # last_event_id itself must be assigned last (MySQL evaluates left to right)
+    return (
+        f"{col} = IF(item_activity.last_event_id IS NULL "
+        f"OR e.last_event_id > item_activity.last_event_id, e.{col}, item_activity.{col})"
+    )
+
+
+def apply_event_rollups(cur, first_event_id, last_event_id=None):
+    """Fold the events with ids first_event_id..last_event_id into the rollups."""
+    last_event_id = last_event_id or first_event_id
+
+    cur.execute(f"""
+        INSERT INTO item_activity ({_ITEM_ACTIVITY_COLUMNS})
+        SELECT * FROM (
+            SELECT
+                item_id,
+                IF(action = 'ADD', timestamp_created, NULL) AS last_in_ts,
+                IF(action = 'REMOVE', timestamp_created, NULL) AS last_out_ts,
+                id AS last_event_id,
+                action AS last_event_action,
+                quantity AS last_event_qty,
+                user_id AS last_event_user_id,
+                timestamp_created AS last_event_ts
+            FROM warehouse_events
+            WHERE id BETWEEN %s AND %s
+        ) AS e
+        ON DUPLICATE KEY UPDATE
+            last_in_ts = COALESCE(GREATEST(e.last_in_ts, item_activity.last_in_ts), e.last_in_ts, item_activity.last_in_ts),
+            last_out_ts = COALESCE(GREATEST(e.last_out_ts, item_activity.last_out_ts), e.last_out_ts, item_activity.last_out_ts),
+            {_newer("last_event_action")},
+            {_newer("last_event_qty")},
+            {_newer("last_event_user_id")},
+            {_newer("last_event_ts")},
+            last_event_id = GREATEST(e.last_event_id, COALESCE(item_activity.last_event_id, 0))
+    """, (first_event_id, last_event_id))
+
+    cur.execute("""
+        INSERT INTO warehouse_daily_counters (warehouse_id, day, action, slot, event_count, quantity)
+        SELECT * FROM (
+            SELECT warehouse_id, DATE(timestamp_created) AS day, action, MOD(item_id, %s) AS slot,
+                   COUNT(*) AS event_count, SUM(quantity) AS quantity
+            FROM warehouse_events
+            WHERE id BETWEEN %s AND %s
+            GROUP BY warehouse_id, DATE(timestamp_created), action, MOD(item_id, %s)
+        ) AS d
+        ORDER BY warehouse_id, day, action, slot
+        ON DUPLICATE KEY UPDATE
+            event_count = warehouse_daily_counters.event_count + d.event_count,
+            quantity = warehouse_daily_counters.quantity + d.quantity
+    """, (COUNTER_SLOTS, first_event_id, last_event_id, COUNTER_SLOTS))
+
+    cur.execute("""
+        INSERT INTO item_daily_stats (item_id, day, action, warehouse_id, event_count, quantity)
+        SELECT * FROM (
+            SELECT item_id, DATE(timestamp_created) AS day, action, MAX(warehouse_id) AS warehouse_id,
+                   COUNT(*) AS event_count, SUM(quantity) AS quantity
+            FROM warehouse_events
+            WHERE id BETWEEN %s AND %s
+            GROUP BY item_id, DATE(timestamp_created), action
+        ) AS d
+        ON DUPLICATE KEY UPDATE
+            event_count = item_daily_stats.event_count + d.event_count,
+            quantity = item_daily_stats.quantity + d.quantity
+    """, (first_event_id, last_event_id))
+
+    cur.execute("""
+        INSERT INTO user_daily_activity (warehouse_id, day, user_id, event_count)
+        SELECT * FROM (
+            SELECT warehouse_id, DATE(timestamp_created) AS day, user_id, COUNT(*) AS event_count
+            FROM warehouse_events
+            WHERE id BETWEEN %s AND %s
+            GROUP BY warehouse_id, DATE(timestamp_created), user_id
+        ) AS d
+        ORDER BY warehouse_id, day, user_id
+        ON DUPLICATE KEY UPDATE
+            event_count = user_daily_activity.event_count + d.event_count
+    """, (first_event_id, last_event_id))
+
+
+def retract_event_rollups(cur, column, value):
+    """
+    Subtract the events matching `column = value`, live and archived, from the
+    counters. Call before deleting those events; column is 'user_id' or 'item_id'.
+    """
+    if column not in ("user_id", "item_id"):
+        raise ValueError("Invalid column")
+    cur.execute(" UNION ".join(
+        f"SELECT DISTINCT warehouse_id FROM {table} WHERE {column} = %s" for table in EVENT_TABLES
+    ), (value,) * len(EVENT_TABLES))
+    warehouse_ids = sorted({row["warehouse_id"] for row in cur.fetchall()})
+    for table in EVENT_TABLES:
+        _retract_daily(cur, table, column, value)
+
+    cur.execute(f"""
+        UPDATE item_monthly_stats s
+        JOIN (
+            SELECT item_id, {MONTH_OF_EVENT} AS month, action,
+                   COUNT(*) AS event_count, SUM(quantity) AS quantity
+            FROM warehouse_events_archive
+            WHERE {column} = %s
+            GROUP BY item_id, month, action
+        ) AS d ON d.item_id = s.item_id AND d.month = s.month AND d.action = s.action
+        SET s.event_count = s.event_count - d.event_count,
+            s.quantity = s.quantity - d.quantity
+    """, (value,))
+
+    for warehouse_id in warehouse_ids:
+        bump_write_version(cur, warehouse_id)
+
+
+def _retract_daily(cur, table, column, value):
+    cur.execute(f"""
+        UPDATE warehouse_daily_counters c
+        JOIN (
+            SELECT warehouse_id, DATE(timestamp_created) AS day, action, MOD(item_id, %s) AS slot,
+                   COUNT(*) AS event_count, SUM(quantity) AS quantity
+            FROM {table}
+            WHERE {column} = %s
+            GROUP BY warehouse_id, DATE(timestamp_created), action, MOD(item_id, %s)
+        ) AS d ON d.warehouse_id = c.warehouse_id AND d.day = c.day
+              AND d.action = c.action AND d.slot = c.slot
+        SET c.event_count = c.event_count - d.event_count,
+            c.quantity = c.quantity - d.quantity
+    """, (COUNTER_SLOTS, value, COUNTER_SLOTS))
+
+    cur.execute(f"""
+        UPDATE item_daily_stats s
+        JOIN (
+            SELECT item_id, DATE(timestamp_created) AS day, action,
+                   COUNT(*) AS event_count, SUM(quantity) AS quantity
+            FROM {table}
+            WHERE {column} = %s
+            GROUP BY item_id, DATE(timestamp_created), action
+        ) AS d ON d.item_id = s.item_id AND d.day = s.day AND d.action = s.action
+        SET s.event_count = s.event_count - d.event_count,
+            s.quantity = s.quantity - d.quantity
+    """, (value,))
+
+    cur.execute(f"""
+        UPDATE user_daily_activity u
+        JOIN (
+            SELECT warehouse_id, DATE(timestamp_created) AS day, user_id, COUNT(*) AS event_count
+            FROM {table}
+            WHERE {column} = %s
+            GROUP BY warehouse_id, DATE(timestamp_created), user_id
+        ) AS d ON d.warehouse_id = u.warehouse_id AND d.day = u.day AND d.user_id = u.user_id
+        SET u.event_count = u.event_count - d.event_count
+    """, (value,))
+
+
+def adjust_stock_totals(cur, warehouse_id, item_id, items=0, quantity=0, low_stock=0):
+    """Apply deltas to the running total_items / total_quantity / low_stock_items."""
+    adjust_stock_totals_many(cur, [(warehouse_id, item_id, items, quantity, low_stock)])
+
+
+def adjust_stock_totals_many(cur, deltas):
+    """
+    deltas: iterable of (warehouse_id, item_id, items, quantity, low_stock).
+    Folded per slot into one multi-row upsert, written in key order so
+    concurrent batches lock the slot rows in the same sequence.
+    """
+    slots = {}
+    for warehouse_id, item_id, items, quantity, low_stock in deltas:
+        acc = slots.setdefault((warehouse_id, item_id % COUNTER_SLOTS), [0, 0, 0])
+        acc[0] += items
+        acc[1] += quantity
+        acc[2] += low_stock
+    if not slots:
+        return
+
+    params = []
+    for (warehouse_id, slot), (items, quantity, low_stock) in sorted(slots.items()):
+        params.extend((warehouse_id, slot, items, quantity, low_stock))
+    values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(slots))
+    cur.execute(f"""
+        INSERT INTO warehouse_stock_totals (warehouse_id, slot, total_items, total_quantity, low_stock_items)
+        VALUES {values}
+        ON DUPLICATE KEY UPDATE
+            total_items = total_items + VALUES(total_items),
+            total_quantity = total_quantity + VALUES(total_quantity),
+            low_stock_items = low_stock_items + VALUES(low_stock_items),
+            write_version = write_version + 1
+    """, params)
+
+
+def bump_write_version(cur, warehouse_id=None):
+    """
+    Invalidate cached statistics after writes that bypass adjust_stock_totals().
+    With a warehouse_id its slot-0 row is created if missing, so the watermark
+    always moves; without one every existing row of every warehouse is bumped.
+    """
+    if warehouse_id is None:
+        cur.execute("UPDATE warehouse_stock_totals SET write_version = write_version + 1")
+    else:
+        cur.execute("""
+            INSERT INTO warehouse_stock_totals (warehouse_id, slot) VALUES (%s, 0)
+            ON DUPLICATE KEY UPDATE write_version = write_version + 1
+        """, (warehouse_id,))
+
+
+def apply_quantity_change_to_totals(cur, item_id, delta):
+    """
+    Fold a quantity change that was just applied to items.quantity into the
+    totals, deriving warehouse and low-stock transition from the updated row.
+    """
+    cur.execute("""
+        INSERT INTO warehouse_stock_totals (warehouse_id, slot, total_items, total_quantity, low_stock_items)
+        SELECT * FROM (
+            SELECT warehouse_id, MOD(id, %s) AS slot, 0 AS total_items, %s AS total_quantity,
+                   (quantity < min_quantity) - (quantity - %s < min_quantity) AS low_stock_items
+            FROM items
+            WHERE id = %s
+        ) AS t
+        ON DUPLICATE KEY UPDATE
+            total_quantity = warehouse_stock_totals.total_quantity + t.total_quantity,
+            low_stock_items = warehouse_stock_totals.low_stock_items + t.low_stock_items,
+            write_version = warehouse_stock_totals.write_version + 1
+    """, (COUNTER_SLOTS, delta, delta, item_id))
+
+
+def adjust_stock_totals_for_item(cur, item_id, sign):
+    """Count an item in (sign=1, after insert) or out of (sign=-1, before delete) the totals."""
+    cur.execute("SELECT warehouse_id, quantity, min_quantity FROM items WHERE id=%s", (item_id,))
+    row = cur.fetchone()
+    if not row:
+        return
+    if not isinstance(row, dict):
+        row = dict(zip(("warehouse_id", "quantity", "min_quantity"), row))
+    is_low = 1 if row["quantity"] < row["min_quantity"] else 0
+    adjust_stock_totals(cur, row["warehouse_id"], item_id,
+                        items=sign, quantity=sign * row["quantity"], low_stock=sign * is_low)
+
+
+def _id_filter(column, ids):
+    if ids is None:
+        return "", ()
+    ids = tuple(ids)
+    if not ids:
+        return None, ()
+    return f"WHERE {column} IN ({', '.join(['%s'] * len(ids))})", ids
+
+
+def rebuild_item_activity(cur, item_ids=None):
+    """
+    Recompute item_activity from the event log (all items, or just item_ids).
+    Archived events are older than live ones, so the archive is folded in
+    first and the live log then overrides whatever it has newer values for.
+    """
+    where, params = _id_filter("i.id", item_ids)
+    if where is None:
+        return
+    _rebuild_item_activity_from(cur, "warehouse_events_archive", where, params, override=True)
+    _rebuild_item_activity_from(cur, "warehouse_events", where, params, override=False)
+
+
+def _rebuild_item_activity_from(cur, table, where, params, override):
+    def keep(col):
+        # override: take the recomputed value as is; otherwise only newer values
+        if override:
+            return f"{col} = a.{col}"
+        return f"{col} = IF(a.last_event_id IS NULL, item_activity.{col}, a.{col})"
+
+    cur.execute(f"""
+        INSERT INTO item_activity ({_ITEM_ACTIVITY_COLUMNS})
+        SELECT * FROM (
+            SELECT
+                i.id AS item_id,
+                (SELECT MAX(timestamp_created) FROM {table} WHERE item_id = i.id AND action = 'ADD') AS last_in_ts,
+                (SELECT MAX(timestamp_created) FROM {table} WHERE item_id = i.id AND action = 'REMOVE') AS last_out_ts,
+                le.id AS last_event_id,
+                le.action AS last_event_action,
+                le.quantity AS last_event_qty,
+                le.user_id AS last_event_user_id,
+                le.timestamp_created AS last_event_ts
+            FROM items i
+            LEFT JOIN {table} le ON le.id = (
+                SELECT id FROM {table}
+                WHERE item_id = i.id
+                ORDER BY timestamp_created DESC, id DESC
+                LIMIT 1
+            )
+            {where}
+        ) AS a
+        ON DUPLICATE KEY UPDATE
+            last_in_ts = {"a.last_in_ts" if override else "COALESCE(a.last_in_ts, item_activity.last_in_ts)"},
+            last_out_ts = {"a.last_out_ts" if override else "COALESCE(a.last_out_ts, item_activity.last_out_ts)"},
+            {keep("last_event_action")},
+            {keep("last_event_qty")},
+            {keep("last_event_user_id")},
+            {keep("last_event_ts")},
+            {keep("last_event_id")}
+    """, params)
+
+
+def rebuild_warehouse_totals(cur):
+    # zero and upsert rather than delete, so write_version keeps growing
+    cur.execute("""
+        UPDATE warehouse_stock_totals
+        SET total_items = 0, total_quantity = 0, low_stock_items = 0,
+            write_version = write_version + 1
+    """)
+    cur.execute("""
+        INSERT INTO warehouse_stock_totals (warehouse_id, slot, total_items, total_quantity, low_stock_items, write_version)
+        SELECT * FROM (
+            SELECT warehouse_id, MOD(id, %s) AS slot, COUNT(*) AS total_items,
+                   COALESCE(SUM(quantity), 0) AS total_quantity,
+                   SUM(CASE WHEN quantity < min_quantity THEN 1 ELSE 0 END) AS low_stock_items,
+                   1 AS write_version
+            FROM items
+            GROUP BY warehouse_id, MOD(id, %s)
+        ) AS t
+        ON DUPLICATE KEY UPDATE
+            total_items = t.total_items,
+            total_quantity = t.total_quantity,
+            low_stock_items = t.low_stock_items
+    """, (COUNTER_SLOTS, COUNTER_SLOTS))
+
+
+def rebuild_daily_counters(cur):
+    cur.execute("DELETE FROM warehouse_daily_counters")
+    cur.execute("""
+        INSERT INTO warehouse_daily_counters (warehouse_id, day, action, slot, event_count, quantity)
+        SELECT warehouse_id, DATE(timestamp_created), action, MOD(item_id, %s), COUNT(*), SUM(quantity)
+        FROM vw_event_log
+        GROUP BY warehouse_id, DATE(timestamp_created), action, MOD(item_id, %s)
+    """, (COUNTER_SLOTS, COUNTER_SLOTS))
+
+
+def rebuild_item_daily_stats(cur):
+    cur.execute("DELETE FROM item_daily_stats")
+    cur.execute("""
+        INSERT INTO item_daily_stats (item_id, day, action, warehouse_id, event_count, quantity)
+        SELECT item_id, DATE(timestamp_created), action, MAX(warehouse_id), COUNT(*), SUM(quantity)
+        FROM vw_event_log
+        GROUP BY item_id, DATE(timestamp_created), action
+    """)
+    cur.execute("DELETE FROM user_daily_activity")
+    cur.execute("""
+        INSERT INTO user_daily_activity (warehouse_id, day, user_id, event_count)
+        SELECT warehouse_id, DATE(timestamp_created), user_id, COUNT(*)
+        FROM vw_event_log
+        GROUP BY warehouse_id, DATE(timestamp_created), user_id
+    """)
+
+
+def rebuild_item_monthly_stats(cur):
+    cur.execute("DELETE FROM item_monthly_stats")
+    cur.execute(f"""
+        INSERT INTO item_monthly_stats (item_id, month, action, warehouse_id, event_count, quantity)
+        SELECT item_id, {MONTH_OF_EVENT}, action, MAX(warehouse_id), COUNT(*), SUM(quantity)
+        FROM warehouse_events_archive
+        GROUP BY item_id, {MONTH_OF_EVENT}, action
+    """)
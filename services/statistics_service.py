@@ -1,133 +1,189 @@
 from db.connection import db_cursor
 from config import Config
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from services.cache import watermark_cached
 
+# All queries read the item_daily_stats / user_daily_activity rollups
+# (services/rollups.py) instead of raw warehouse_events, so their cost depends
+# on items x days in the window, not on the size of the event log.
+# Windows are whole days: the last N days plus today.
+#
+# Results are cached per (function, warehouse_id, days, limit) and served
+# until the warehouse's write watermark moves or the day changes.
+
+def _watermark(warehouse_id):
+    """(today, summed write_version) of one warehouse's stock totals, or of all with None"""
+    scope, params = ("WHERE warehouse_id = %s", (warehouse_id,)) if warehouse_id is not None else ("", ())
+    with db_cursor() as (_, cur):
+        cur.execute(f"""
+            SELECT CAST(COALESCE(SUM(write_version), 0) AS SIGNED) as watermark
+            FROM warehouse_stock_totals
+            {scope}
+        """, params)
+        row = cur.fetchone()
+    return (date.today(), row["watermark"] if row else 0)
+
+def _event_watermark(arguments):
+    return _watermark(arguments.get("warehouse_id") or Config.DEFAULT_WAREHOUSE_ID)
+
+def _stock_watermark(arguments):
+    # get_low_stock_items() covers every warehouse unless it is given one
+    return _watermark(arguments.get("warehouse_id"))
+
+stats_cached = watermark_cached(_event_watermark, maxsize=Config.STATS_CACHE_SIZE)
+
+@stats_cached
 def get_quantity_changes(warehouse_id=None, days=30):
     """Get items with quantity changes in the last N days"""
     warehouse_id = warehouse_id or Config.DEFAULT_WAREHOUSE_ID
-    
+
     with db_cursor() as (_, cur):
         cur.execute("""
-            SELECT 
+            SELECT
                 i.id,
                 i.name,
                 i.type,
                 i.sku,
                 i.quantity as current_quantity,
-                COALESCE(SUM(CASE WHEN we.action = 'ADD' THEN we.quantity ELSE 0 END), 0) as total_added,
-                COALESCE(SUM(CASE WHEN we.action = 'REMOVE' THEN we.quantity ELSE 0 END), 0) as total_removed,
-                COUNT(we.id) as total_events
-            FROM items i
-            LEFT JOIN warehouse_events we ON i.id = we.item_id 
-                AND we.timestamp_created >= DATE_SUB(NOW(), INTERVAL %s DAY)
-            WHERE i.warehouse_id = %s
+                COALESCE(SUM(CASE WHEN s.action = 'ADD' THEN s.quantity ELSE 0 END), 0) as total_added,
+                COALESCE(SUM(CASE WHEN s.action = 'REMOVE' THEN s.quantity ELSE 0 END), 0) as total_removed,
+                CAST(SUM(s.event_count) AS SIGNED) as total_events
+            FROM item_daily_stats s
+            JOIN items i ON i.id = s.item_id
+            WHERE s.warehouse_id = %s
+                AND s.day >= DATE(DATE_SUB(NOW(), INTERVAL %s DAY))
             GROUP BY i.id, i.name, i.type, i.sku, i.quantity
             HAVING total_events > 0
             ORDER BY total_events DESC, i.name
-        """, (days, warehouse_id))
+        """, (warehouse_id, days))
         return cur.fetchall()
 
+@stats_cached
 def get_top_added_items(warehouse_id=None, days=30, limit=10):
     """Get items with most quantity added"""
     warehouse_id = warehouse_id or Config.DEFAULT_WAREHOUSE_ID
-    
+
     with db_cursor() as (_, cur):
         cur.execute("""
-            SELECT 
+            SELECT
                 i.name,
                 i.type,
                 i.sku,
-                SUM(we.quantity) as total_added,
-                COUNT(we.id) as add_count
-            FROM items i
-            JOIN warehouse_events we ON i.id = we.item_id
-            WHERE we.action = 'ADD'
-                AND i.warehouse_id = %s
-                AND we.timestamp_created >= DATE_SUB(NOW(), INTERVAL %s DAY)
+                SUM(s.quantity) as total_added,
+                CAST(SUM(s.event_count) AS SIGNED) as add_count
+            FROM item_daily_stats s
+            JOIN items i ON i.id = s.item_id
+            WHERE s.action = 'ADD'
+                AND s.event_count > 0
+                AND s.warehouse_id = %s
+                AND s.day >= DATE(DATE_SUB(NOW(), INTERVAL %s DAY))
             GROUP BY i.id, i.name, i.type, i.sku
             ORDER BY total_added DESC
             LIMIT %s
         """, (warehouse_id, days, limit))
         return cur.fetchall()
 
+@stats_cached
 def get_top_removed_items(warehouse_id=None, days=30, limit=10):
     """Get items with most quantity removed"""
     warehouse_id = warehouse_id or Config.DEFAULT_WAREHOUSE_ID
-    
+
     with db_cursor() as (_, cur):
         cur.execute("""
-            SELECT 
+            SELECT
                 i.name,
                 i.type,
                 i.sku,
-                SUM(we.quantity) as total_removed,
-                COUNT(we.id) as remove_count
-            FROM items i
-            JOIN warehouse_events we ON i.id = we.item_id
-            WHERE we.action = 'REMOVE'
-                AND i.warehouse_id = %s
-                AND we.timestamp_created >= DATE_SUB(NOW(), INTERVAL %s DAY)
+                SUM(s.quantity) as total_removed,
+                CAST(SUM(s.event_count) AS SIGNED) as remove_count
+            FROM item_daily_stats s
+            JOIN items i ON i.id = s.item_id
+            WHERE s.action = 'REMOVE'
+                AND s.event_count > 0
+                AND s.warehouse_id = %s
+                AND s.day >= DATE(DATE_SUB(NOW(), INTERVAL %s DAY))
             GROUP BY i.id, i.name, i.type, i.sku
             ORDER BY total_removed DESC
             LIMIT %s
         """, (warehouse_id, days, limit))
         return cur.fetchall()
 
+@stats_cached
 def get_activity_by_day(warehouse_id=None, days=30):
     """Get daily activity summary"""
     warehouse_id = warehouse_id or Config.DEFAULT_WAREHOUSE_ID
-    
+
     with db_cursor() as (_, cur):
         cur.execute("""
-            SELECT 
-                DATE(timestamp_created) as date,
+            SELECT
+                day as date,
                 SUM(CASE WHEN action = 'ADD' THEN quantity ELSE 0 END) as added,
                 SUM(CASE WHEN action = 'REMOVE' THEN quantity ELSE 0 END) as removed,
-                COUNT(*) as total_transactions
-            FROM warehouse_events
+                CAST(SUM(event_count) AS SIGNED) as total_transactions
+            FROM item_daily_stats
             WHERE warehouse_id = %s
-                AND timestamp_created >= DATE_SUB(NOW(), INTERVAL %s DAY)
-            GROUP BY DATE(timestamp_created)
+                AND day >= DATE(DATE_SUB(NOW(), INTERVAL %s DAY))
+            GROUP BY day
+            HAVING total_transactions > 0
             ORDER BY date DESC
         """, (warehouse_id, days))
         return cur.fetchall()
 
+@stats_cached
 def get_activity_by_type(warehouse_id=None, days=30):
     """Get activity summary by item type"""
     warehouse_id = warehouse_id or Config.DEFAULT_WAREHOUSE_ID
-    
+
     with db_cursor() as (_, cur):
         cur.execute("""
-            SELECT 
+            SELECT
                 i.type,
                 COUNT(DISTINCT i.id) as item_count,
-                COALESCE(SUM(CASE WHEN we.action = 'ADD' THEN we.quantity ELSE 0 END), 0) as total_added,
-                COALESCE(SUM(CASE WHEN we.action = 'REMOVE' THEN we.quantity ELSE 0 END), 0) as total_removed,
-                COALESCE(COUNT(we.id), 0) as total_events
+                COALESCE(SUM(CASE WHEN s.action = 'ADD' THEN s.quantity ELSE 0 END), 0) as total_added,
+                COALESCE(SUM(CASE WHEN s.action = 'REMOVE' THEN s.quantity ELSE 0 END), 0) as total_removed,
+                CAST(COALESCE(SUM(s.event_count), 0) AS SIGNED) as total_events
             FROM items i
-            LEFT JOIN warehouse_events we ON i.id = we.item_id 
-                AND we.timestamp_created >= DATE_SUB(NOW(), INTERVAL %s DAY)
+            LEFT JOIN item_daily_stats s ON i.id = s.item_id
+                AND s.day >= DATE(DATE_SUB(NOW(), INTERVAL %s DAY))
             WHERE i.warehouse_id = %s
             GROUP BY i.type
             ORDER BY total_events DESC, i.type
         """, (days, warehouse_id))
         return cur.fetchall()
 
+@stats_cached
 def get_statistics_summary(warehouse_id=None, days=30):
     """Get overall statistics summary"""
     warehouse_id = warehouse_id or Config.DEFAULT_WAREHOUSE_ID
-    
+
     with db_cursor() as (_, cur):
         cur.execute("""
-            SELECT 
+            SELECT
                 (SELECT COUNT(*) FROM items WHERE warehouse_id = %s AND quantity > 0) as active_items,
-                COUNT(*) as total_transactions,
-                SUM(CASE WHEN action = 'ADD' THEN quantity ELSE 0 END) as total_added,
-                SUM(CASE WHEN action = 'REMOVE' THEN quantity ELSE 0 END) as total_removed,
-                COUNT(DISTINCT user_id) as active_users,
-                COUNT(DISTINCT DATE(timestamp_created)) as active_days
-            FROM warehouse_events
-            WHERE warehouse_id = %s
-                AND timestamp_created >= DATE_SUB(NOW(), INTERVAL %s DAY)
-        """, (warehouse_id, warehouse_id, days))
+                CAST(COALESCE(SUM(s.event_count), 0) AS SIGNED) as total_transactions,
+                SUM(CASE WHEN s.action = 'ADD' THEN s.quantity ELSE 0 END) as total_added,
+                SUM(CASE WHEN s.action = 'REMOVE' THEN s.quantity ELSE 0 END) as total_removed,
+                (SELECT COUNT(DISTINCT user_id) FROM user_daily_activity
+                 WHERE warehouse_id = %s AND event_count > 0
+                   AND day >= DATE(DATE_SUB(NOW(), INTERVAL %s DAY))) as active_users,
+                COUNT(DISTINCT CASE WHEN s.event_count > 0 THEN s.day END) as active_days
+            FROM item_daily_stats s
+            WHERE s.warehouse_id = %s
+                AND s.day >= DATE(DATE_SUB(NOW(), INTERVAL %s DAY))
+        """, (warehouse_id, warehouse_id, days, warehouse_id, days))
         return cur.fetchone()
+
+@watermark_cached(_stock_watermark, maxsize=Config.STATS_CACHE_SIZE)
+def get_low_stock_items(warehouse_id=None, limit=10):
+    """Get items below their minimum quantity, most critical first (all warehouses unless one is given)"""
+    scope, params = ("AND warehouse_id = %s", (warehouse_id,)) if warehouse_id is not None else ("", ())
+
+    with db_cursor() as (_, cur):
+        cur.execute(f"""
+            SELECT name, type, quantity, min_quantity
+            FROM items
+            WHERE quantity < min_quantity AND quantity > 0 {scope}
+            ORDER BY (quantity / min_quantity) ASC
+            LIMIT %s
+        """, (*params, limit))
+        return cur.fetchall()
@@ -0,0 +1,152 @@
+import random
+import time
+from mysql.connector import Error, errorcode
+from config import Config
+from db.connection import db_cursor, in_outer_transaction
+from services.rollups import apply_event_rollups, apply_quantity_change_to_totals, adjust_stock_totals_many
+
+ACTIONS = ("ADD", "REMOVE", "RETURN")
+
+# lock-wait timeouts and deadlocks are transient; the movement is retried
+RETRYABLE_ERRORS = (errorcode.ER_LOCK_WAIT_TIMEOUT, errorcode.ER_LOCK_DEADLOCK)
+
+
+def apply_movement(item_id: int, user_id: int, action: str, qty: int,
+                   note: str = None, warehouse_id: int = None) -> int:
+    """
+    Apply one ADD / REMOVE / RETURN and record its warehouse_events row.
+
+    The stock check and the change are a single guarded UPDATE, so the item
+    row is locked only from that statement to commit, with no read beforehand.
+    When warehouse_id is given the item must belong to that warehouse.
+    Returns the new event id.
+    """
+    if qty <= 0:
+        raise ValueError("Quantity must be > 0")
+    if action not in ACTIONS:
+        raise ValueError("Invalid action")
+
+    delta = qty if action in ("ADD", "RETURN") else -qty
+
+    attempt = 0
+    while True:
+        try:
+            return _apply_once(item_id, user_id, action, qty, delta, note, warehouse_id)
+        except Error as e:
+            # inside a caller's transaction a deadlock has already rolled back
+            # the caller's work too, so only a standalone movement is retried
+            if (e.errno not in RETRYABLE_ERRORS or attempt >= Config.STOCK_RETRY_ATTEMPTS
+                    or in_outer_transaction()):
+                raise
+            attempt += 1
+            time.sleep(Config.STOCK_RETRY_BACKOFF * (2 ** attempt) * random.random())
+
+
+def _apply_once(item_id, user_id, action, qty, delta, note, warehouse_id):
+    scope = "" if warehouse_id is None else " AND warehouse_id=%s"
+    scope_params = () if warehouse_id is None else (warehouse_id,)
+
+    with db_cursor(savepoint=True) as (_, cur):
+        cur.execute(
+            f"UPDATE items SET quantity = quantity + %s WHERE id=%s{scope} AND quantity + %s >= 0",
+            (delta, item_id, *scope_params, delta),
+        )
+        if cur.rowcount == 0:
+            # nothing changed: tell "missing" apart from "not enough stock"
+            cur.execute(f"SELECT id FROM items WHERE id=%s{scope}", (item_id, *scope_params))
+            if not cur.fetchone():
+                raise ValueError("Item not found" if warehouse_id is None else "Item not found in this warehouse")
+            raise ValueError("Not enough stock to remove")
+
+        cur.execute("""
+            INSERT INTO warehouse_events (warehouse_id, item_id, user_id, action, quantity, note)
+            SELECT warehouse_id, id, %s, %s, %s, %s FROM items WHERE id=%s
+        """, (user_id, action, qty, note, item_id))
+        event_id = cur.lastrowid
+
+        apply_event_rollups(cur, event_id)
+        apply_quantity_change_to_totals(cur, item_id, delta)
+        return event_id
+
+
+def apply_movements(cur, movements, atomic=False):
+    """
+    Apply many movements in the caller's transaction.
+
+    movements: (item_id, user_id, action, qty, note, warehouse_id) tuples,
+    already validated (see apply_movement), applied in order. Item rows are
+    locked in ascending id order so concurrent callers cannot deadlock on
+    each other. A movement that can't be applied (missing item, other
+    warehouse, not enough stock) is reported and skipped; with atomic=True
+    nothing is written if any movement fails.
+
+    Returns (event_ids, errors): event_ids[i] is movement i's event id or
+    None, errors a list of (i, message).
+    """
+    if not movements:
+        return [], []
+
+    item_ids = sorted({m[0] for m in movements})
+    cur.execute(f"""
+        SELECT id, warehouse_id, quantity, min_quantity
+        FROM items
+        WHERE id IN ({", ".join(["%s"] * len(item_ids))})
+        ORDER BY id
+        FOR UPDATE
+    """, item_ids)
+    items = {row["id"]: row for row in cur.fetchall()}
+
+    quantities = {item_id: row["quantity"] for item_id, row in items.items()}
+    accepted, errors = [], []
+    for i, (item_id, user_id, action, qty, note, warehouse_id) in enumerate(movements):
+        row = items.get(item_id)
+        if row is None or (warehouse_id is not None and row["warehouse_id"] != warehouse_id):
+            errors.append((i, "Item not found" if warehouse_id is None else "Item not found in this warehouse"))
+            continue
+        new_qty = quantities[item_id] + (qty if action in ("ADD", "RETURN") else -qty)
+        if new_qty < 0:
+            errors.append((i, "Not enough stock to remove"))
+            continue
+        quantities[item_id] = new_qty
+        accepted.append(i)
+
+    event_ids = [None] * len(movements)
+    if not accepted or (atomic and errors):
+        return event_ids, errors
+
+    changed = [item_id for item_id in item_ids if item_id in items and quantities[item_id] != items[item_id]["quantity"]]
+    if changed:
+        cases = " ".join(["WHEN %s THEN %s"] * len(changed))
+        params = [v for item_id in changed for v in (item_id, quantities[item_id])]
+        cur.execute(f"""
+            UPDATE items SET quantity = CASE id {cases} END
+            WHERE id IN ({", ".join(["%s"] * len(changed))})
+        """, params + changed)
+
+    # a multi-row INSERT ... VALUES is given consecutive auto-increment ids
+    values = ", ".join(["(%s,%s,%s,%s,%s,%s)"] * len(accepted))
+    params = []
+    for i in accepted:
+        item_id, user_id, action, qty, note, _ = movements[i]
+        params.extend((items[item_id]["warehouse_id"], item_id, user_id, action, qty, note))
+    cur.execute(f"""
+        INSERT INTO warehouse_events (warehouse_id, item_id, user_id, action, quantity, note)
+        VALUES {values}
+    """, params)
+    first_id = cur.lastrowid
+    apply_event_rollups(cur, first_id, first_id + len(accepted) - 1)
+    for offset, i in enumerate(accepted):
+        event_ids[i] = first_id + offset
+
+    # every item with a new event gets a delta, zero if its quantity netted
+    # out, so the slot's write_version (the statistics watermark) still moves
+    deltas = []
+    for item_id in sorted({movements[i][0] for i in accepted}):
+        row = items[item_id]
+        was_low = row["quantity"] < row["min_quantity"]
+        is_low = quantities[item_id] < row["min_quantity"]
+        deltas.append((row["warehouse_id"], item_id, 0,
+                       quantities[item_id] - row["quantity"], int(is_low) - int(was_low)))
+    adjust_stock_totals_many(cur, deltas)
+
+    return event_ids, errors
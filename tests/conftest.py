@@ -0,0 +1,50 @@
+"""
+Every test that takes the `db` fixture runs against a fresh embedded SQLite
+database (DB_BACKEND = "sqlite") seeded by db/init_db.py: admin user 1,
+warehouse 1 and six items, ids 1-6. Install requirements-dev.txt and run
+`python -m pytest` from the repo root.
+"""
+import contextlib
+import io
+import pytest
+from config import Config
+from db import connection, init_db
+from services import auth_service, inventory_service, statistics_service
+
+
+def _clear_caches():
+    for value in vars(statistics_service).values():
+        cache = getattr(value, "cache", None)
+        if cache is not None:
+            cache.clear()
+    auth_service._user_cache.clear()
+    inventory_service.invalidate_qr_cache()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DB_BACKEND", "sqlite")
+    monkeypatch.setattr(Config, "SQLITE_PATH", str(tmp_path / "dronify.sqlite3"))
+    monkeypatch.setattr(Config, "STOCK_GROUP_COMMIT", False)
+    _clear_caches()
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db.main()
+    yield
+    pool, connection._pool = connection._pool, None
+    if pool is not None:
+        pool.dispose()
+    _clear_caches()
+
+
+@pytest.fixture
+def client(db):
+    """Test client logged in as the seeded admin"""
+    from app import create_app
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = "1"
+        session["_fresh"] = True
+    return client
+
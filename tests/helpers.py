@@ -0,0 +1,22 @@
+from db.connection import db_cursor
+
+
+def query(sql, params=()):
+    with db_cursor() as (_, cur):
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def quantity(item_id):
+    return query("SELECT quantity FROM items WHERE id=%s", (item_id,))[0]["quantity"]
+
+
+def add_user(email="staff@dronify.com"):
+    """Insert a STAFF user and return its id"""
+    with db_cursor() as (conn, cur):
+        cur.execute("""
+            INSERT INTO users (first_name, last_name, email, password_hash, role)
+            VALUES (%s, %s, %s, %s, %s)
+        """, ("Staff", "User", email, "x", "STAFF"))
+        conn.commit()
+        return cur.lastrowid
@@ -0,0 +1,71 @@
+import io
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from config import Config
+from qr import batch_decode
+from qr.batch_decode import decode_images, iter_images
+
+
+def _zip(entries):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_zip_entries_are_expanded():
+    data = _zip([("a.png", b"1"), ("notes.txt", b"x"), ("dir/b.jpg", b"22")])
+    assert list(iter_images([("photos.zip", data), ("c.png", b"333")])) == [
+        ("photos.zip/a.png", b"1"), ("photos.zip/dir/b.jpg", b"22"), ("c.png", b"333"),
+    ]
+
+
+def test_image_byte_limit(monkeypatch):
+    monkeypatch.setattr(Config, "QR_MAX_IMAGE_BYTES", 1000)
+    bomb = _zip([("big.png", b"\0" * 5000)])  # compresses to a few bytes
+    with pytest.raises(ValueError, match="big.png is larger than 1000 bytes"):
+        list(iter_images([("bomb.zip", bomb)]))
+
+
+def test_batch_byte_limit(monkeypatch):
+    monkeypatch.setattr(Config, "QR_BATCH_MAX_BYTES", 2500)
+    entries = [(f"{i}.png", b"\0" * 1000) for i in range(3)]
+    with pytest.raises(ValueError, match="larger than 2500 bytes in total"):
+        list(iter_images([("photos.zip", _zip(entries))]))
+
+
+def test_image_count_limit():
+    with pytest.raises(ValueError, match="At most 2 images"):
+        list(iter_images([(f"{i}.png", b"1") for i in range(3)], max_images=2))
+
+
+class _BrokenPool:
+    _max_workers = 1
+    shut_down = False
+
+    def map(self, fn, *iterables, chunksize=1):
+        raise BrokenProcessPool("a worker died")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_broken_shared_pool_is_replaced(monkeypatch):
+    broken = _BrokenPool()
+    monkeypatch.setattr(batch_decode, "_pool", broken)
+    with pytest.raises(BrokenProcessPool):
+        decode_images([("a.png", b"1")])
+    assert broken.shut_down
+    assert batch_decode._pool is None
+
+
+def test_broken_caller_executor_is_left_alone(monkeypatch):
+    shared = object()
+    monkeypatch.setattr(batch_decode, "_pool", shared)
+    broken = _BrokenPool()
+    with pytest.raises(BrokenProcessPool):
+        decode_images([("a.png", b"1")], executor=broken)
+    assert not broken.shut_down
+    assert batch_decode._pool is shared
@@ -0,0 +1,134 @@
+import io
+import json
+import pytest
+from services.import_service import import_items, read_rows
+from tests.helpers import query
+
+pytestmark = pytest.mark.usefixtures("db")
+
+
+def _item(sku):
+    return query("""
+        SELECT name, type, description, quantity, min_quantity, location, qr_code
+        FROM items WHERE sku=%s
+    """, (sku,))[0]
+
+
+def _ndjson(*lines):
+    return read_rows(io.BytesIO("\n".join(lines).encode()), "ndjson")
+
+
+def test_inserts_and_updates():
+    report = import_items([
+        {"sku": "CAM001", "name": "FPV Camera", "type": "camera", "quantity": "4", "min_quantity": "2"},
+        {"sku": "DRONE001", "name": "Quadcopter Drone v2", "type": "DRONE", "quantity": 99},
+    ])
+    assert (report.inserted, report.updated, report.errors) == (1, 1, [])
+    assert _item("CAM001")["type"] == "CAMERA"
+    drone = _item("DRONE001")
+    assert drone["name"] == "Quadcopter Drone v2"
+    assert drone["quantity"] == 5  # stock of existing items only changes through movements
+
+
+def test_empty_optional_fields_keep_current_values():
+    import_items([{"sku": "BAT001", "name": "LiPo Battery 3S", "type": "BATTERY", "min_quantity": 12}])
+    import_items([{"sku": "BAT001", "name": "LiPo Battery 3S", "type": "BATTERY",
+                   "description": "", "location": None, "qr_code": "", "min_quantity": ""}])
+    import_items([{"sku": "BAT001", "name": "LiPo Battery 3S", "type": "BATTERY"}])
+    battery = _item("BAT001")
+    assert battery["description"] == "3S 2200mAh LiPo battery"
+    assert battery["location"] == "Shelf B2"
+    assert battery["qr_code"] == "QR-BAT001"
+    assert battery["min_quantity"] == 12
+
+
+def test_explicit_zero_is_kept():
+    import_items([
+        {"sku": "BAT001", "name": "LiPo Battery 3S", "type": "BATTERY", "min_quantity": 0},
+        {"sku": "CAM001", "name": "FPV Camera", "type": "CAMERA", "min_quantity": " "},
+    ])
+    assert _item("BAT001")["min_quantity"] == 0
+    assert _item("CAM001")["min_quantity"] == 5
+
+
+@pytest.mark.parametrize("row, message", [
+    ({"type": "MOTOR"}, "name is required"),
+    ({"name": "Thing", "type": "GADGET"}, "Invalid type 'GADGET'"),
+    ({"name": "Thing", "type": "MOTOR", "quantity": "many"}, "must be integers"),
+    ({"name": "Thing", "type": "MOTOR", "min_quantity": -1}, "must be >= 0"),
+    (["not", "an", "object"], "Row is not an object"),
+])
+def test_invalid_rows_are_reported(row, message):
+    report = import_items([row, {"name": "Thing", "type": "MOTOR"}])
+    assert report.inserted == 1
+    assert len(report.errors) == 1
+    assert report.errors[0][0] == 1
+    assert message in report.errors[0][1]
+
+
+def test_duplicate_sku_in_file():
+    report = import_items([
+        {"sku": "CAM001", "name": "FPV Camera", "type": "CAMERA"},
+        {"sku": "CAM001", "name": "FPV Camera HD", "type": "CAMERA"},
+    ])
+    assert report.inserted == 1
+    assert report.errors == [(2, "Duplicate SKU 'CAM001' in file")]
+    assert _item("CAM001")["name"] == "FPV Camera"
+
+
+def test_qr_code_of_another_item_is_rejected():
+    report = import_items([
+        {"sku": "NEW999", "name": "Hijack", "type": "MOTOR", "qr_code": "QR-BAT001"},
+        {"sku": "MOT001", "name": "Brushless Motor 2205", "type": "MOTOR", "qr_code": "QR-ESC001"},
+        {"sku": "CAM001", "name": "FPV Camera", "type": "CAMERA", "qr_code": "QR-CAM001"},
+        {"sku": "CAM002", "name": "FPV Camera HD", "type": "CAMERA", "qr_code": "QR-CAM001"},
+        {"sku": "BAT001", "name": "LiPo Battery 3S", "type": "BATTERY", "location": "Shelf B3"},
+    ])
+    assert (report.inserted, report.updated) == (1, 1)
+    assert report.errors == [
+        (4, "Duplicate QR code 'QR-CAM001' in file"),
+        (1, "QR code 'QR-BAT001' already belongs to SKU 'BAT001'"),
+        (2, "QR code 'QR-ESC001' already belongs to SKU 'ESC001'"),
+    ]
+    assert (_item("BAT001")["name"], _item("BAT001")["type"]) == ("LiPo Battery 3S", "BATTERY")
+    assert (_item("ESC001")["name"], _item("MOT001")["qr_code"]) == ("30A ESC", "QR-MOT001")
+    assert query("SELECT COUNT(*) as n FROM items WHERE sku='NEW999'")[0]["n"] == 0
+
+
+def test_bad_ndjson_line_is_reported():
+    rows = _ndjson(
+        json.dumps({"sku": "CAM001", "name": "FPV Camera", "type": "CAMERA"}),
+        '{"sku": "CAM002", "name": ',
+        "",
+        json.dumps({"sku": "CAM003", "name": "Action Camera", "type": "CAMERA"}),
+    )
+    report = import_items(rows)
+    assert report.inserted == 2
+    assert len(report.errors) == 1
+    assert report.errors[0][0] == 2
+    assert report.errors[0][1].startswith("Invalid JSON")
+
+
+def test_csv_rows():
+    stream = io.BytesIO(b"\xef\xbb\xbfsku,name,type,quantity\nCAM001,FPV Camera,CAMERA,3\n")
+    report = import_items(read_rows(stream, "csv"))
+    assert report.inserted == 1
+    assert _item("CAM001")["quantity"] == 3
+
+
+def test_unsupported_format():
+    with pytest.raises(ValueError, match="Unsupported import format"):
+        list(read_rows(io.BytesIO(b""), "xml"))
+
+
+def test_stock_totals_follow_import():
+    import_items([
+        {"sku": "CAM001", "name": "FPV Camera", "type": "CAMERA", "quantity": 1, "min_quantity": 3},
+        {"sku": "PROP001", "name": "5x4.5 Propeller", "type": "PROPELLER", "min_quantity": 50},
+    ])
+    totals = query("""
+        SELECT CAST(SUM(total_items) AS SIGNED) as items, CAST(SUM(total_quantity) AS SIGNED) as quantity,
+               CAST(SUM(low_stock_items) AS SIGNED) as low
+        FROM warehouse_stock_totals WHERE warehouse_id = 1
+    """)[0]
+    assert totals == {"items": 7, "quantity": 5 + 10 + 8 + 6 + 20 + 3 + 1, "low": 2}
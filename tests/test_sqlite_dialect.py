@@ -0,0 +1,174 @@
+import re
+from datetime import date
+import pytest
+from mysql.connector import IntegrityError, errorcode
+from backfill_rollups import backfill_rollups
+from db import init_db, sqlite_backend
+from db.connection import db_cursor
+from db.sqlite_backend import translate
+from services import inventory_service, statistics_service as stats
+from services.export_service import iter_events, iter_inventory
+from services.import_service import _UPSERT_SQL, import_items
+from services.retention import archive_events
+from services.stock_engine import apply_movements
+from tests.helpers import add_user, query
+
+# MySQL spellings translate() must have rewritten before SQLite sees a statement
+MYSQL_ONLY = re.compile(
+    r"%s|ON DUPLICATE KEY|VALUES\s*\(\s*\w+\s*\)|FOR UPDATE|\bNOW\(\)|\bCURDATE\(\)|\bINTERVAL\b"
+    r"|\bIF\s*\(|\bGREATEST\s*\(|\bLEAST\s*\(|\bCONCAT\s*\(|\bDAYOFMONTH\s*\(|\bAS SIGNED\b"
+    r"|\bAUTO_INCREMENT\b|\bENUM\s*\(|\bENGINE\s*=|\bON UPDATE CURRENT_TIMESTAMP\b|\bOR REPLACE VIEW\b",
+    re.IGNORECASE,
+)
+
+ROLLUP_TABLES = {
+    "item_daily_stats": "event_count > 0",
+    "user_daily_activity": "event_count > 0",
+    "item_monthly_stats": "event_count > 0",
+    "warehouse_daily_counters": "event_count > 0",
+    "item_activity": "last_event_id IS NOT NULL",
+}
+
+
+@pytest.fixture
+def issued(db, monkeypatch):
+    """Every SQL string sent through translate() while the test runs"""
+    statements = []
+
+    def recording_translate(sql):
+        statements.append(sql)
+        return translate(sql)
+
+    monkeypatch.setattr(sqlite_backend, "translate", recording_translate)
+    return statements
+
+
+def _workload(client):
+    """Drive the services and pages that talk to the database"""
+    staff_id = add_user()
+    inventory_service.apply_stock_action(1, 1, "ADD", 4, "restock")
+    inventory_service.apply_stock_action(2, staff_id, "REMOVE", 3)
+    inventory_service.apply_stock_batch([
+        {"item_id": 3, "action": "REMOVE", "quantity": 2},
+        {"item_id": 3, "action": "RETURN", "quantity": 1, "note": "unused"},
+    ], staff_id)
+    with db_cursor() as (conn, cur):
+        cur.execute("UPDATE warehouse_events SET timestamp_created = '2000-01-15 10:00:00' WHERE item_id = 2")
+        conn.commit()
+    backfill_rollups()  # events changed outside the app
+    archive_events(months=1)
+    inventory_service.apply_stock_action(2, staff_id, "ADD", 1)
+
+    import_items([
+        {"sku": "CAM001", "name": "FPV Camera", "type": "CAMERA", "quantity": 2},
+        {"sku": "ESC001", "name": "30A ESC", "type": "ESC", "min_quantity": 10},
+    ])
+    inventory_service.add_item("Gimbal", "3-axis", "CAMERA", 1, "QR-GIMBAL")
+    inventory_service.resolve_qr_codes(["QR-BAT001", "QR-GIMBAL", "QR-MISSING"])
+    list(iter_inventory())
+    list(iter_events(since=date(2000, 1, 1), until=date.today()))
+    for fn in (stats.get_quantity_changes, stats.get_top_added_items, stats.get_top_removed_items,
+               stats.get_activity_by_day, stats.get_activity_by_type, stats.get_statistics_summary,
+               stats.get_low_stock_items):
+        fn()
+
+    for url in ("/dashboard", "/inventory", "/inventory?sort=quantity&order=desc", "/warehouse",
+                "/statistics", "/reports", "/users", "/requests", "/scan/manual?qr_code=QR-DRONE001",
+                "/export/events.csv?since=2000-01-01&until=2100-01-01", "/export/statistics/summary.csv"):
+        response = client.get(url)
+        assert response.status_code == 200, url
+        response.get_data()
+
+    client.post("/inventory/delete/4")
+    client.post(f"/users/delete/{staff_id}")
+
+
+def test_service_statements_translate(client, issued):
+    _workload(client)
+    assert len(set(issued)) > 50
+    leftovers = {}
+    for sql in set(issued):
+        for statement in translate(sql).statements:
+            match = MYSQL_ONLY.search(statement)
+            if match:
+                leftovers[" ".join(sql.split())[:120]] = match.group(0)
+    assert leftovers == {}
+
+
+def test_incremental_rollups_match_rebuild(client):
+    _workload(client)
+    incremental = _rollups()
+    backfill_rollups()
+    assert _rollups() == incremental
+
+
+def _rollups():
+    snapshot = {}
+    for table, live in ROLLUP_TABLES.items():
+        rows = query(f"SELECT * FROM {table} WHERE {live}")
+        snapshot[table] = sorted(tuple(sorted(row.items())) for row in rows)
+    totals = query("""
+        SELECT warehouse_id, slot, total_items, total_quantity, low_stock_items
+        FROM warehouse_stock_totals WHERE total_items > 0
+        ORDER BY warehouse_id, slot
+    """)
+    snapshot["warehouse_stock_totals"] = totals
+    return snapshot
+
+
+def test_translate_upsert():
+    statement, = translate(_UPSERT_SQL).statements
+    assert "ON CONFLICT DO UPDATE SET" in statement
+    assert "COALESCE(excluded.qr_code, qr_code)" in statement
+    assert translate(_UPSERT_SQL).kind == "insert"
+
+
+def test_translate_locking_read_takes_write_lock():
+    translation = translate("SELECT id FROM items WHERE id IN (%s, %s) ORDER BY id FOR UPDATE")
+    assert translation.statements == ("SELECT id FROM items WHERE id IN (?, ?) ORDER BY id",)
+    assert translation.kind == "write"
+
+
+def test_translate_ddl():
+    for sql in init_db.DDL:
+        translation = translate(sql)
+        assert translation.kind == "ddl"
+        for statement in translation.statements:
+            assert not MYSQL_ONLY.search(statement), statement
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("DATE_SUB('2024-03-31', INTERVAL 1 MONTH)", "2024-02-29"),
+    ("DATE_ADD('2024-02-28', INTERVAL 1 DAY)", "2024-02-29"),
+    ("DATE_SUB(DATE('2024-05-20 08:00:00'), INTERVAL DAYOFMONTH('2024-05-20 08:00:00') - 1 DAY)", "2024-05-01"),
+    ("IF(1 > 2, 'a', 'b')", "b"),
+    ("GREATEST(1, 3, 2)", 3),
+    ("LEAST(4, 2)", 2),
+    ("CONCAT('a', ' ', 'b')", "a b"),
+    ("MOD(17, 16)", 1),
+    ("CAST('12' AS SIGNED)", 12),
+])
+def test_functions(db, expression, expected):
+    assert query(f"SELECT {expression} as value")[0]["value"] == expected
+
+
+@pytest.mark.parametrize("values, errno", [
+    (("Admin", "Again", "admin@dronify.com", "x", "STAFF"), errorcode.ER_DUP_ENTRY),
+    (("No", "Email", None, "x", "STAFF"), errorcode.ER_BAD_NULL_ERROR),
+    (("Bad", "Role", "boss@dronify.com", "x", "BOSS"), errorcode.ER_CHECK_CONSTRAINT_VIOLATED),
+])
+def test_integrity_errors_map_to_mysql_errno(db, values, errno):
+    with pytest.raises(IntegrityError) as e:
+        with db_cursor() as (conn, cur):
+            cur.execute("""
+                INSERT INTO users (first_name, last_name, email, password_hash, role)
+                VALUES (%s, %s, %s, %s, %s)
+            """, values)
+    assert e.value.errno == errno
+
+
+def test_foreign_key_error(db):
+    with db_cursor() as (conn, cur):
+        with pytest.raises(IntegrityError) as e:
+            apply_movements(cur, [(1, 999, "ADD", 1, None, None)])
+    assert e.value.errno == errorcode.ER_ROW_IS_REFERENCED_2
@@ -0,0 +1,132 @@
+import io
+import pytest
+from backfill_rollups import backfill_rollups
+from db.connection import db_cursor
+from services import statistics_service as stats
+from services.import_service import import_items
+from services.retention import archive_events
+from services.stock_engine import apply_movement, apply_movements
+from tests.helpers import add_user, query
+
+pytestmark = pytest.mark.usefixtures("db")
+
+STATS = [
+    stats.get_quantity_changes,
+    stats.get_top_added_items,
+    stats.get_top_removed_items,
+    stats.get_activity_by_day,
+    stats.get_activity_by_type,
+    stats.get_statistics_summary,
+    stats.get_low_stock_items,
+]
+
+
+def _cached():
+    return [fn() for fn in STATS]
+
+
+def _fresh():
+    return [fn.__wrapped__() for fn in STATS]
+
+
+def _assert_current():
+    """Every cached statistic equals a recomputation"""
+    assert _cached() == _fresh()
+
+
+def test_cache_serves_repeated_calls():
+    apply_movement(1, 1, "ADD", 3)
+    first = _cached()
+    hits = stats.get_statistics_summary.cache.stats()["hits"]
+    assert _cached() == first
+    assert stats.get_statistics_summary.cache.stats()["hits"] == hits + 1
+
+
+def test_movement_invalidates():
+    before = _cached()
+    apply_movement(1, 1, "ADD", 3)
+    apply_movement(2, 1, "REMOVE", 10)
+    assert _cached() != before
+    _assert_current()
+
+
+def test_net_zero_batch_invalidates():
+    _cached()
+    with db_cursor() as (conn, cur):
+        apply_movements(cur, [(1, 1, "ADD", 3, None, None), (1, 1, "REMOVE", 3, None, None)])
+        conn.commit()
+    assert stats.get_statistics_summary()["total_transactions"] == 2
+    _assert_current()
+
+
+def test_user_delete_invalidates(client):
+    user_id = add_user()
+    apply_movement(1, user_id, "ADD", 3)
+    apply_movement(2, 1, "ADD", 1)
+    assert stats.get_statistics_summary()["active_users"] == 2
+
+    response = client.post(f"/users/delete/{user_id}")
+    assert response.status_code == 302
+    assert stats.get_statistics_summary()["active_users"] == 1
+    _assert_current()
+
+
+def test_delete_of_user_with_archived_events_invalidates(client):
+    user_id = add_user()
+    apply_movement(1, user_id, "ADD", 3)
+    with db_cursor() as (conn, cur):
+        cur.execute("UPDATE warehouse_events SET timestamp_created = '2000-01-15 10:00:00'")
+        conn.commit()
+    backfill_rollups()  # events changed outside the app
+    archive_events(months=1)
+    _cached()
+
+    client.post(f"/users/delete/{user_id}")
+    _assert_current()
+
+
+def test_item_delete_invalidates(client):
+    apply_movement(3, 1, "REMOVE", 6)  # 8 -> 2, below its minimum of 3
+    assert [row["name"] for row in stats.get_low_stock_items()] == ["Brushless Motor 2205"]
+
+    client.post("/inventory/delete/3")
+    assert stats.get_low_stock_items() == []
+    _assert_current()
+
+
+def test_import_update_invalidates():
+    apply_movement(4, 1, "ADD", 2)
+    assert stats.get_activity_by_type()[0]["type"] == "ESC"
+
+    rows = [{"sku": "ESC001", "name": "30A ESC", "type": "MOTOR"}]
+    report = import_items(rows)
+    assert report.updated == 1
+    busiest = stats.get_activity_by_type()[0]
+    assert (busiest["type"], busiest["item_count"]) == ("MOTOR", 2)
+    _assert_current()
+
+
+def test_import_route_invalidates(client):
+    before = stats.get_low_stock_items()
+    data = {"file": (io.BytesIO(b"sku,name,type,min_quantity\nBAT001,LiPo Battery 3S,BATTERY,50\n"), "items.csv")}
+    response = client.post("/inventory/import", data=data, content_type="multipart/form-data")
+    assert response.status_code == 200
+    assert stats.get_low_stock_items() != before
+    _assert_current()
+
+
+def test_low_stock_covers_every_warehouse():
+    with db_cursor() as (conn, cur):
+        cur.execute("INSERT INTO warehouses (id, name) VALUES (2, 'Overflow')")
+        conn.commit()
+    import_items([{"sku": "BAT900", "name": "Spare Battery", "type": "BATTERY", "quantity": 4, "min_quantity": 1}],
+                 warehouse_id=2)
+    assert stats.get_low_stock_items() == []
+
+    item_id = query("SELECT id FROM items WHERE sku='BAT900'")[0]["id"]
+    apply_movement(item_id, 1, "REMOVE", 4)
+    apply_movement(item_id, 1, "ADD", 1)
+    import_items([{"sku": "BAT900", "name": "Spare Battery", "type": "BATTERY", "min_quantity": 3}], warehouse_id=2)
+    assert [row["name"] for row in stats.get_low_stock_items()] == ["Spare Battery"]
+    assert [row["name"] for row in stats.get_low_stock_items(warehouse_id=2)] == ["Spare Battery"]
+    assert stats.get_low_stock_items(warehouse_id=1) == []
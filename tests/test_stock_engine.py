@@ -0,0 +1,174 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import pytest
+from mysql.connector import IntegrityError, errorcode
+from config import Config
+from db.connection import db_cursor
+from services import group_commit
+from services.group_commit import GroupCommitWriter
+from services.inventory_service import apply_stock_action
+from services.stock_engine import apply_movement, apply_movements
+from tests.helpers import add_user, query, quantity
+
+pytestmark = pytest.mark.usefixtures("db")
+
+
+def _totals():
+    return query("""
+        SELECT CAST(SUM(total_items) AS SIGNED) as items, CAST(SUM(total_quantity) AS SIGNED) as quantity,
+               CAST(SUM(low_stock_items) AS SIGNED) as low
+        FROM warehouse_stock_totals WHERE warehouse_id = 1
+    """)[0]
+
+
+def _expected_totals():
+    return query("""
+        SELECT COUNT(*) as items, CAST(SUM(quantity) AS SIGNED) as quantity,
+               CAST(SUM(CASE WHEN quantity < min_quantity THEN 1 ELSE 0 END) AS SIGNED) as low
+        FROM items WHERE warehouse_id = 1
+    """)[0]
+
+
+def test_apply_movement_adds_and_removes():
+    add_id = apply_movement(1, 1, "ADD", 4, note="restock")
+    remove_id = apply_movement(1, 1, "REMOVE", 6)
+    assert quantity(1) == 5 + 4 - 6
+    events = query("SELECT id, action, quantity, note FROM warehouse_events ORDER BY id")
+    assert [(e["id"], e["action"], e["quantity"], e["note"]) for e in events] == [
+        (add_id, "ADD", 4, "restock"),
+        (remove_id, "REMOVE", 6, None),
+    ]
+    assert _totals() == _expected_totals()
+
+
+@pytest.mark.parametrize("args, message", [
+    ((1, 1, "REMOVE", 6), "Not enough stock to remove"),
+    ((99, 1, "ADD", 1), "Item not found"),
+    ((1, 1, "ADD", 0), "Quantity must be > 0"),
+    ((1, 1, "MOVE", 1), "Invalid action"),
+])
+def test_apply_movement_rejects(args, message):
+    with pytest.raises(ValueError, match=message):
+        apply_movement(*args)
+    assert quantity(1) == 5
+    assert query("SELECT COUNT(*) as n FROM warehouse_events")[0]["n"] == 0
+
+
+def test_apply_movement_checks_warehouse():
+    with pytest.raises(ValueError, match="Item not found in this warehouse"):
+        apply_movement(1, 1, "ADD", 1, warehouse_id=2)
+
+
+def test_apply_movements_in_order_and_skips_failures():
+    movements = [
+        (1, 1, "ADD", 5, None, None),      # 5 -> 10
+        (1, 1, "REMOVE", 8, None, None),   # 10 -> 2, only possible after the ADD
+        (1, 1, "REMOVE", 3, None, None),   # not enough stock
+        (99, 1, "ADD", 1, None, None),     # no such item
+        (2, 1, "RETURN", 1, "back", 1),
+    ]
+    with db_cursor() as (conn, cur):
+        event_ids, errors = apply_movements(cur, movements)
+        conn.commit()
+
+    assert errors == [(2, "Not enough stock to remove"), (3, "Item not found")]
+    assert event_ids[2] is None and event_ids[3] is None
+    first = event_ids[0]
+    assert [event_ids[0], event_ids[1], event_ids[4]] == [first, first + 1, first + 2]
+    assert quantity(1) == 2
+    assert quantity(2) == 11
+    assert _totals() == _expected_totals()
+
+
+def test_apply_movements_atomic_writes_nothing_on_error():
+    with db_cursor() as (conn, cur):
+        event_ids, errors = apply_movements(cur, [
+            (1, 1, "ADD", 5, None, None),
+            (2, 1, "REMOVE", 100, None, None),
+        ], atomic=True)
+        conn.commit()
+    assert event_ids == [None, None]
+    assert errors == [(1, "Not enough stock to remove")]
+    assert quantity(1) == 5
+    assert query("SELECT COUNT(*) as n FROM warehouse_events")[0]["n"] == 0
+
+
+def test_group_commit_isolates_a_failing_movement():
+    writer = GroupCommitWriter(max_delay=0.2)
+    try:
+        good = writer.submit(1, 1, "ADD", 2)
+        bad = writer.submit(2, 999, "ADD", 1)  # no such user: foreign key violation
+        also_good = writer.submit(3, 1, "REMOVE", 1)
+        assert good.result(timeout=10)
+        assert also_good.result(timeout=10)
+        with pytest.raises(IntegrityError) as e:
+            bad.result(timeout=10)
+        assert e.value.errno == errorcode.ER_ROW_IS_REFERENCED_2
+    finally:
+        writer.stop()
+    assert (quantity(1), quantity(2), quantity(3)) == (7, 10, 7)
+
+
+def test_group_commit_keeps_stock_totals():
+    user_id = add_user()
+    writer = GroupCommitWriter()
+    try:
+        event_id = writer.submit(1, user_id, "REMOVE", 5).result(timeout=10)
+    finally:
+        writer.stop()
+    assert query("SELECT user_id FROM warehouse_events WHERE id=%s", (event_id,))[0]["user_id"] == user_id
+    assert _totals() == _expected_totals()
+
+
+def test_group_commit_unexpected_error_keeps_writer(monkeypatch):
+    calls = []
+
+    def broken_commit(self, batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return original(self, batch)
+
+    original = GroupCommitWriter._commit
+    monkeypatch.setattr(GroupCommitWriter, "_commit", broken_commit)
+    writer = GroupCommitWriter()
+    try:
+        with pytest.raises(RuntimeError):
+            writer.submit(1, 1, "ADD", 1).result(timeout=10)
+        assert writer.alive
+        assert writer.submit(1, 1, "ADD", 2).result(timeout=10)
+    finally:
+        writer.stop()
+    assert quantity(1) == 7
+
+
+def test_stuck_writer_does_not_block_caller(monkeypatch):
+    release = threading.Event()
+    original = GroupCommitWriter._commit
+
+    def stuck_commit(self, batch):
+        release.wait(10)
+        return original(self, batch)
+
+    monkeypatch.setattr(GroupCommitWriter, "_commit", stuck_commit)
+    monkeypatch.setattr(Config, "STOCK_GROUP_COMMIT", True)
+    monkeypatch.setattr(Config, "GROUP_COMMIT_TIMEOUT", 0.2)
+    monkeypatch.setattr(group_commit, "_writer", None)
+    try:
+        with pytest.raises(FutureTimeoutError, match="outcome is unknown"):
+            apply_stock_action(1, 1, "ADD", 1)
+    finally:
+        release.set()
+        group_commit._writer.stop()
+    assert quantity(1) == 6  # the movement was being written and did commit
+
+
+def test_dead_writer_is_replaced(monkeypatch):
+    monkeypatch.setattr(group_commit, "_writer", None)
+    writer = group_commit.get_group_writer()
+    writer.stop()
+    replacement = group_commit.get_group_writer()
+    try:
+        assert replacement is not writer and replacement.alive
+    finally:
+        replacement.stop()